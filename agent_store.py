@@ -0,0 +1,370 @@
+# agent_store.py
+import numpy as np
+from event_log import PATH_RECALC
+
+# --- STATE CODES (shared by rickshaws and police) ---
+IDLE, HUNTING, DELIVERING, PATROL, PURSUIT = range(5)
+STATE_NAMES = ("IDLE", "HUNTING", "DELIVERING", "PATROL", "PURSUIT")
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+# --- AGENT KINDS ---
+KIND_RICKSHAW = 0
+KIND_POLICE = 1
+
+class AgentStore:
+    """
+    Structure-of-arrays storage for every agent in the simulation.
+    Row i holds agent i; node/edge/passenger fields use -1 for "none".
+    Rickshaw and PoliceUnit objects are thin views onto one row each.
+    """
+    # (name, dtype, fill value) for every per-agent column
+    COLUMNS = (
+        ("kind", np.int8, KIND_RICKSHAW),
+        ("current_node", np.int32, -1),
+        ("target_node", np.int32, -1),
+        ("current_edge", np.int32, -1),
+        ("destination_node", np.int32, -1),
+        ("progress", np.float64, 0.0),
+        ("state", np.int8, IDLE),
+        ("money", np.int64, 0),
+        ("passenger", np.int32, -1),
+        ("target_agent", np.int32, -1),
+        ("path_pos", np.int32, 0),
+        ("path_start", np.int64, 0),   # Where the agent's path begins in the shared path buffer
+        ("path_len", np.int32, 0),     # Nodes in the path (0 = no path)
+        ("path_cap", np.int32, 0),     # Buffer slots reserved for this agent (reused while big enough)
+    )
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.capacity = max(1, capacity)
+        for name, dtype, fill in self.COLUMNS:
+            setattr(self, name, np.full(self.capacity, fill, dtype=dtype))
+
+        # Every agent's path, back to back: path_nodes[k] is a node index and
+        # path_edges[k] the edge from path_nodes[k] to path_nodes[k + 1]
+        self.path_nodes = np.zeros(max(64, 8 * self.capacity), dtype=np.int32)
+        self.path_edges = np.zeros(len(self.path_nodes), dtype=np.int32)
+        self.path_end = 0  # First free slot
+
+        # Per-agent Python-side data (the objects they point at)
+        self.riders = []   # Passenger object carried by each rickshaw (or None)
+        self.views = []    # The Rickshaw/PoliceUnit object for each row
+
+        # node -> set of rickshaw rows standing on / leaving that node (built on first use)
+        self.at_node = None
+
+        # Optional callback(row) whenever set_path changes an agent's edge
+        self.path_listener = None
+        self.path_changes = 0  # Routes computed so far (see path_recalculated)
+        self.event_log = None  # Optional event_log.EventLog, shared by the engine and every agent
+
+    def add(self, kind, view):
+        """Appends a new agent row and returns its index."""
+        if self.size == self.capacity:
+            self._grow()
+        i = self.size
+        self.size += 1
+        self.kind[i] = kind
+        self.riders.append(None)
+        self.views.append(view)
+        return i
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for name, dtype, fill in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.full(new_capacity, fill, dtype=dtype)
+            new[:self.capacity] = old
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    # --- Movement Kernel ---
+
+    def advance(self, dt, edge_load, speed_base, traffic_penalty, police_speed):
+        """
+        Advances every agent that is on an edge in one vectorized pass.
+        Rickshaws slow down with the load on their edge; police always drive at police_speed.
+        Returns the indices of agents that reached their target node this tick.
+        """
+        n = self.size
+        moving = np.flatnonzero(self.current_edge[:n] >= 0)
+        if len(moving) == 0:
+            return moving
+
+        load = edge_load[self.current_edge[moving]]
+        is_police = self.kind[moving] == KIND_POLICE
+
+        # Formula: Higher load = Lower speed (police ignore traffic)
+        speed = np.where(is_police, police_speed, speed_base / (1 + load * traffic_penalty))
+        progress = self.progress[moving] + speed * dt
+        self.progress[moving] = progress
+
+        return moving[progress >= 1.0]
+
+    def settle_arrivals(self, arrived, city):
+        """
+        Moves the arrived agents onto their target node as one masked batch:
+        edge loads are released and re-applied in bulk, then each agent steps along its path.
+        """
+        if len(arrived) == 0:
+            return
+
+        # Remove load from the edges we just finished (only rickshaws count as traffic)
+        rick = arrived[self.kind[arrived] == KIND_RICKSHAW]
+        city.add_loads(self.current_edge[rick], -1)
+
+        # Update Position (and the node index, if anyone is using it)
+        if self.at_node is not None:
+            for i, old, new in zip(rick.tolist(), self.current_node[rick].tolist(), self.target_node[rick].tolist()):
+                self._move_in_index(i, old, new)
+        self.current_node[arrived] = self.target_node[arrived]
+        self.progress[arrived] = 0.0
+
+        # Pick next step in path (one gather from the path buffer)
+        pos = self.path_pos[arrived] + 1
+        self.path_pos[arrived] = pos
+        hop = self.path_start[arrived] + pos
+        has_next = pos + 1 < self.path_len[arrived]
+        going = arrived[has_next]
+        self.target_node[going] = self.path_nodes[hop[has_next] + 1]
+        self.current_edge[going] = self.path_edges[hop[has_next]]
+        finished = arrived[~has_next]
+        self.target_node[finished] = -1
+        self.current_edge[finished] = -1
+
+        # Add load to the next edges
+        rick = rick[self.current_edge[rick] >= 0]
+        city.add_loads(self.current_edge[rick], 1)
+
+    # --- Agents-by-Node Index ---
+
+    def agents_at(self, node):
+        """Rows of the rickshaws whose current node is `node` (kept up to date on arrivals)."""
+        if self.at_node is None:
+            self.at_node = {}
+            for i in np.flatnonzero(self.kind[:self.size] == KIND_RICKSHAW).tolist():
+                self.at_node.setdefault(int(self.current_node[i]), set()).add(i)
+        return self.at_node.get(node, ())
+
+    def _move_in_index(self, i, old, new):
+        agents = self.at_node.get(old)
+        if agents is not None:
+            agents.discard(i)
+            if not agents:
+                del self.at_node[old]
+        self.at_node.setdefault(new, set()).add(i)
+
+    def set_path(self, i, path, city):
+        """
+        Puts agent i at the start of a new path (node list). Does not touch edge loads.
+        The path is copied into the shared buffer, reusing the agent's old slots if they fit.
+        """
+        n = len(path)
+        if n > self.path_cap[i]:
+            self._reserve_path(i, n)
+        start = self.path_start[i]
+        self.path_len[i] = n
+        self.path_pos[i] = 0
+        if n > 1:
+            self.path_nodes[start:start + n] = path
+            self.path_edges[start:start + n - 1] = [city.edge_id(u, v) for u, v in zip(path, path[1:])]
+            self.target_node[i] = path[1]
+            self.current_edge[i] = self.path_edges[start]
+            self.progress[i] = 0.0
+        else:
+            self.target_node[i] = -1
+            self.current_edge[i] = -1
+        if self.path_listener is not None:
+            self.path_listener(i)
+
+    def path_recalculated(self, i):
+        """
+        Called by the agents after set_path with a freshly computed route. Clearing a path
+        or moving a row between stores also goes through set_path but is no recalculation.
+        """
+        self.path_changes += 1
+        if self.event_log is not None:
+            self.event_log.emit(PATH_RECALC, self.views[i].id, -1, self.destination_node[i], self.path_len[i])
+
+    def _reserve_path(self, i, n):
+        """Gives agent i n fresh slots at the end of the path buffer (compacting/growing it if full)."""
+        if self.path_end + n > len(self.path_nodes):
+            self._compact_paths(n)
+        self.path_start[i] = self.path_end
+        self.path_cap[i] = n
+        self.path_end += n
+
+    def _compact_paths(self, extra):
+        """
+        Drops the slots no agent uses any more by copying live paths to the front of a
+        new buffer, at least twice the live size so compactions stay rare.
+        """
+        rows = np.flatnonzero(self.path_len[:self.size] > 0)
+        live = int(self.path_len[rows].sum())
+        size = max(len(self.path_nodes), 2 * (live + extra))
+        nodes = np.zeros(size, dtype=np.int32)
+        edges = np.zeros(size, dtype=np.int32)
+        end = 0
+        for i in rows.tolist():
+            start, n = self.path_start[i], self.path_len[i]
+            nodes[end:end + n] = self.path_nodes[start:start + n]
+            edges[end:end + n] = self.path_edges[start:start + n]
+            self.path_start[i] = end
+            self.path_cap[i] = n
+            end += n
+        self.path_cap[:self.size][self.path_len[:self.size] == 0] = 0
+        self.path_nodes, self.path_edges, self.path_end = nodes, edges, end
+
+    # --- Whole-Store Snapshots ---
+
+    def snapshot_arrays(self):
+        """Copies of every column (live rows only) and of the used part of the path buffer."""
+        arrays = {name: getattr(self, name)[:self.size].copy() for name, _, _ in self.COLUMNS}
+        arrays["path_nodes"] = self.path_nodes[:self.path_end].copy()
+        arrays["path_edges"] = self.path_edges[:self.path_end].copy()
+        return arrays
+
+    def load_arrays(self, arrays):
+        """
+        Overwrites the store with snapshot_arrays() output. The rows must already exist
+        (same count and kinds); riders and the node index are left to the caller.
+        """
+        n = self.size
+        for name, _, _ in self.COLUMNS:
+            getattr(self, name)[:n] = arrays[name]
+        end = len(arrays["path_nodes"])
+        size = max(len(self.path_nodes), 2 * end)
+        self.path_nodes = np.zeros(size, dtype=np.int32)
+        self.path_edges = np.zeros(size, dtype=np.int32)
+        self.path_nodes[:end] = arrays["path_nodes"]
+        self.path_edges[:end] = arrays["path_edges"]
+        self.path_end = end
+        self.at_node = None  # Rebuilt on next use
+
+    # --- Moving Agents Between Stores (sharded runs) ---
+
+    def export_row(self, i):
+        """
+        Everything needed to recreate agent i in another store, as a plain picklable
+        tuple: (column values, remaining path, carried passenger as (id, node, dest) or None).
+        """
+        values = tuple(getattr(self, name)[i].item() for name in self._portable_columns())
+        start = self.path_start[i]
+        path = self.path_nodes[start + self.path_pos[i]:start + self.path_len[i]].tolist()
+        pax = self.riders[i]
+        rider = None if pax is None else (pax.id, pax.node, pax.dest)
+        return values, path, rider
+
+    def import_row(self, i, record, city):
+        """
+        Overwrites row i (already added with the right kind) with an exported agent.
+        Row references (target_agent) do not travel. Returns the rider tuple; edge loads are untouched.
+        """
+        values, path, rider = record
+        for name, value in zip(self._portable_columns(), values):
+            getattr(self, name)[i] = value
+        self.target_agent[i] = -1
+        progress = self.progress[i]
+        self.set_path(i, path, city)
+        self.progress[i] = progress
+        self.at_node = None  # Rebuilt on next use, with the row at its new node
+        return rider
+
+    @classmethod
+    def _portable_columns(cls):
+        return [name for name, _, _ in cls.COLUMNS if not name.startswith("path_")]
+
+    def remove_rows(self, rows):
+        """
+        Deletes agents by moving the last row into each hole. Moved views get their new
+        index, and target_agent references to removed agents become -1.
+        """
+        for i in sorted(rows, reverse=True):
+            last = self.size - 1
+            targets = self.target_agent[:self.size]
+            targets[targets == i] = -1
+            if i != last:
+                for name, _, _ in self.COLUMNS:
+                    column = getattr(self, name)
+                    column[i] = column[last]
+                self.riders[i] = self.riders[last]
+                self.views[i] = self.views[last]
+                self.views[i].idx = i
+                targets[targets == last] = i
+            self.riders.pop()
+            self.views.pop()
+            self.size = last
+        self.at_node = None  # Rebuilt on next use
+
+    def positions(self, city, indices=None):
+        """Interpolated (lon, lat) of the given agents as an (n, 2) array."""
+        if indices is None:
+            indices = np.arange(self.size)
+        pos = city.node_pos[self.current_node[indices]].copy()
+        on_edge = self.target_node[indices] >= 0
+        if on_edge.any():
+            start = pos[on_edge]
+            end = city.node_pos[self.target_node[indices][on_edge]]
+            t = self.progress[indices][on_edge][:, None]
+            pos[on_edge] = start + (end - start) * t
+        return pos
+
+class AgentView:
+    """Attribute-style access to one row of an AgentStore."""
+
+    __slots__ = ("store", "idx")
+
+    def __init__(self, store, kind):
+        self.store = store
+        self.idx = store.add(kind, self)
+
+    def _node_field(name):
+        def get(self):
+            value = getattr(self.store, name)[self.idx]
+            return None if value < 0 else int(value)
+        def set(self, value):
+            getattr(self.store, name)[self.idx] = -1 if value is None else value
+        return property(get, set)
+
+    def _plain_field(name, cast):
+        def get(self):
+            return cast(getattr(self.store, name)[self.idx])
+        def set(self, value):
+            getattr(self.store, name)[self.idx] = value
+        return property(get, set)
+
+    current_node = _node_field("current_node")
+    target_node = _node_field("target_node")
+    destination_node = _node_field("destination_node")
+    current_edge = _plain_field("current_edge", int)
+    progress = _plain_field("progress", float)
+    money = _plain_field("money", int)
+    del _node_field, _plain_field
+
+    @property
+    def state(self):
+        return STATE_NAMES[self.store.state[self.idx]]
+
+    @state.setter
+    def state(self, name):
+        self.store.state[self.idx] = STATE_CODES[name]
+
+    @property
+    def path(self):
+        """Remaining path, starting at the current node."""
+        store, i = self.store, self.idx
+        start = store.path_start[i]
+        return store.path_nodes[start + store.path_pos[i]:start + store.path_len[i]].tolist()
+
+    def get_position(self):
+        store = self.store
+        node_pos = self.city.node_pos
+        i = self.idx
+        if store.target_node[i] < 0: return tuple(node_pos[store.current_node[i]])
+        start = node_pos[store.current_node[i]]
+        end = node_pos[store.target_node[i]]
+        t = store.progress[i]
+        lon = start[0] + (end[0] - start[0]) * t
+        lat = start[1] + (end[1] - start[1]) * t
+        return (lon, lat)
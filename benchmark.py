@@ -0,0 +1,180 @@
+# benchmark.py
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from city import CityGraph
+from logic_engine import SimulationEngine
+from profiler import Profiler
+
+# --- SCENARIOS ---
+# Scaling curves: start from a base scenario and vary one knob at a time.
+CITY_SIZES = {
+    "irregular": None,
+    "1k": {"zones": 4, "zone_rows": 16, "zone_cols": 16},
+    "10k": {"zones": 16, "zone_rows": 25, "zone_cols": 25, "bridges_per_link": 2},
+    "100k": {"zones": 100, "zone_rows": 32, "zone_cols": 32, "bridges_per_link": 3},
+}
+
+SUITES = {
+    "quick": {
+        "base": {"city": "1k", "rickshaws": 200, "police": 4, "spawn_rate": 0.05},
+        "axes": {
+            "city": ["irregular", "1k", "10k"],
+            "rickshaws": [50, 200, 1000],
+            "police": [1, 4, 16],
+            "spawn_rate": [0.01, 0.05, 0.2],
+        },
+        "warmup_ticks": 100,
+        "ticks": 300,
+    },
+    "full": {
+        "base": {"city": "10k", "rickshaws": 1000, "police": 8, "spawn_rate": 0.1},
+        "axes": {
+            "city": ["irregular", "1k", "10k", "100k"],
+            "rickshaws": [100, 1000, 5000, 10000],
+            "police": [1, 8, 32, 128],
+            "spawn_rate": [0.02, 0.1, 0.5, 1.0],
+        },
+        "warmup_ticks": 300,
+        "ticks": 1000,
+    },
+}
+
+def build_scenarios(suite):
+    """Base scenario plus one-knob-at-a-time variations, without duplicates."""
+    spec = SUITES[suite]
+    scenarios = []
+    seen = set()
+    for axis, values in spec["axes"].items():
+        for value in values:
+            params = dict(spec["base"], **{axis: value})
+            name = f"city={params['city']} r={params['rickshaws']} p={params['police']} spawn={params['spawn_rate']}"
+            if name in seen:
+                continue
+            seen.add(name)
+            scenarios.append(dict(params, name=name, axis=axis,
+                                  warmup_ticks=spec["warmup_ticks"], ticks=spec["ticks"]))
+    return scenarios
+
+def run_scenario(scenario, dt=1.0 / 60, seed=1):
+    """Runs one scenario in the current process and returns its measurements."""
+    t0 = time.perf_counter()
+    city = CityGraph(150, layout=CITY_SIZES[scenario["city"]])
+    engine = SimulationEngine(city=city, seed=seed, n_rickshaws=scenario["rickshaws"],
+                              n_police=scenario["police"], spawn_rate=scenario["spawn_rate"])
+    setup_seconds = time.perf_counter() - t0
+
+    for _ in range(scenario["warmup_ticks"]):
+        engine.update(dt)
+
+    # Per-phase times and counters come from the engine's own profiler hooks
+    engine.profiler = Profiler(capacity=scenario["ticks"])
+
+    builds_before = city.route_tree_builds
+    deliveries_before = engine.deliveries
+
+    start = time.perf_counter()
+    for _ in range(scenario["ticks"]):
+        engine.update(dt)
+    elapsed = time.perf_counter() - start
+    ticks = scenario["ticks"]
+    profile = engine.profiler.summary()
+
+    return {
+        "name": scenario["name"],
+        "axis": scenario["axis"],
+        "params": {k: scenario[k] for k in ("city", "rickshaws", "police", "spawn_rate")},
+        "nodes": city.num_nodes,
+        "edges": city.num_edges,
+        "ticks": ticks,
+        "setup_seconds": setup_seconds,
+        "ticks_per_second": ticks / elapsed if elapsed > 0 else float("inf"),
+        "ms_per_tick": 1000 * elapsed / ticks,
+        "phase_ms_per_tick": profile["phase_ms"],
+        "shortest_path_calls_per_tick": profile["counters"]["shortest_path_calls"],
+        "path_recalculations_per_tick": profile["counters"]["path_recalculations"],
+        "route_tree_builds": city.route_tree_builds - builds_before,
+        "deliveries": engine.deliveries - deliveries_before,
+        # Linux reports kilobytes; each scenario runs in a fresh process so this is per scenario
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def run_suite(suite, quiet=False):
+    """Runs every scenario of a suite, each in its own fresh process (clean memory numbers)."""
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for scenario in build_scenarios(suite):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            result = pool.submit(run_scenario, scenario).result()
+        results.append(result)
+        if not quiet:
+            print(f"{result['name']:<45} {result['ticks_per_second']:>9.1f} ticks/s  "
+                  f"{result['peak_rss_mb']:>7.1f} MB  {result['shortest_path_calls_per_tick']:>7.2f} sp/tick",
+                  flush=True)
+    return results
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(old, new, threshold):
+    """Prints per-scenario speed ratios; returns the names that got slower than threshold."""
+    old_by_name = {r["name"]: r for r in old["results"]}
+    regressions = []
+    print(f"{'scenario':<45} {'old t/s':>9} {'new t/s':>9} {'ratio':>6}")
+    for r in new["results"]:
+        base = old_by_name.get(r["name"])
+        if base is None:
+            continue
+        ratio = r["ticks_per_second"] / base["ticks_per_second"]
+        flag = "  <-- regression" if ratio < threshold else ""
+        print(f"{r['name']:<45} {base['ticks_per_second']:>9.1f} {r['ticks_per_second']:>9.1f} {ratio:>6.2f}{flag}")
+        if ratio < threshold:
+            regressions.append(r["name"])
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine tick-throughput benchmarks and scaling curves.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--output", default=None, help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, metavar="OLD_JSON", help="Compare against an earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.9,
+                        help="With --compare: exit non-zero if any scenario runs below this speed ratio")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        "suite": args.suite,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "machine": platform.platform(),
+        "results": run_suite(args.suite),
+    }
+
+    output = args.output or os.path.join("bench_results", f"{args.suite}-{commit or 'nocommit'}-{int(time.time())}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, report, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
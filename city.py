@@ -1,13 +1,32 @@
 # city.py
+import copy
 import networkx as nx
+import numpy as np
+import heapq
 import math
+import random
+import config as c
 
 class CityGraph:
-    def __init__(self, block_size_meters=100):
+    def __init__(self, block_size_meters=100, layout=None, graph=None):
+        """
+        layout: None for the hand-made two-zone map, or a dict of keyword
+        arguments for build_generated_city (e.g. {"zones": 16, "zone_rows": 25}).
+        graph: a ready networkx DiGraph in the same schema (node pos/type/zone, edge
+        weight/capacity/type), e.g. a real street network from city_loader.
+        """
         # We no longer need rows/cols for the whole map, just for coordinate scaling
         self.block_size = block_size_meters
+        self.route_penalty = None   # None = route on static weights, else load-aware (see set_route_penalty)
+        self.route_version = 0      # Bumped on every new route cost snapshot
         self.G = nx.DiGraph()
-        self.build_irregular_city()
+        if graph is not None:
+            self.G = graph
+        elif layout is None:
+            self.build_irregular_city()
+        else:
+            self.build_generated_city(**layout)
+        self.compile()
 
     def build_irregular_city(self):
         """
@@ -18,10 +37,10 @@ class CityGraph:
         base_lon = 77.6412
         
         # Helper to get coords
-        def get_pos(r, c):
+        def get_pos(r, col):
             lat_step = (self.block_size / 111320)
             lon_step = (self.block_size / (40075000 * math.cos(math.radians(base_lat)) / 360))
-            return (base_lon + (c * lon_step), base_lat + (r * lat_step))
+            return (base_lon + (col * lon_step), base_lat + (r * lat_step))
 
         # --- 1. Define Nodes (The "Board Game" Spots) ---
         
@@ -29,39 +48,39 @@ class CityGraph:
         # Rows 0-2, Cols 0-2
         west_nodes = []
         for r in range(3):
-            for c in range(3):
-                node_id = f"res-{r}-{c}"
-                self.G.add_node(node_id, pos=get_pos(r, c), type="residential")
+            for col in range(3):
+                node_id = f"res-{r}-{col}"
+                self.G.add_node(node_id, pos=get_pos(r, col), type="residential", zone=0)
                 west_nodes.append(node_id)
 
         # Zone B: Commercial (East) - A dense 3x3 Cluster
         # Shifted to Cols 6-8 (leaving a gap of 3 blocks for the bridge)
         east_nodes = []
         for r in range(3):
-            for c in range(6, 9):
-                node_id = f"com-{r}-{c}"
-                self.G.add_node(node_id, pos=get_pos(r, c), type="commercial")
+            for col in range(6, 9):
+                node_id = f"com-{r}-{col}"
+                self.G.add_node(node_id, pos=get_pos(r, col), type="commercial", zone=1)
                 east_nodes.append(node_id)
 
         # --- 2. Define Edges (The Connections) ---
 
         # Internal Streets for West Zone (Residential)
         for r in range(3):
-            for c in range(3):
-                curr = f"res-{r}-{c}"
+            for col in range(3):
+                curr = f"res-{r}-{col}"
                 # Connect East
-                if c < 2: self._add_two_way_street(curr, f"res-{r}-{c+1}")
+                if col < 2: self._add_two_way_street(curr, f"res-{r}-{col+1}")
                 # Connect North
-                if r < 2: self._add_two_way_street(curr, f"res-{r+1}-{c}")
+                if r < 2: self._add_two_way_street(curr, f"res-{r+1}-{col}")
 
         # Internal Streets for East Zone (Commercial)
         for r in range(3):
-            for c in range(6, 9):
-                curr = f"com-{r}-{c}"
+            for col in range(6, 9):
+                curr = f"com-{r}-{col}"
                 # Connect East
-                if c < 8: self._add_two_way_street(curr, f"com-{r}-{c+1}")
+                if col < 8: self._add_two_way_street(curr, f"com-{r}-{col+1}")
                 # Connect North
-                if r < 2: self._add_two_way_street(curr, f"com-{r+1}-{c}")
+                if r < 2: self._add_two_way_street(curr, f"com-{r+1}-{col}")
 
         # --- 3. The Bottleneck (The Bridge) ---
         # Connects the middle of West (res-1-2) to middle of East (com-1-6)
@@ -71,39 +90,501 @@ class CityGraph:
         # High capacity but it's the ONLY way across.
         # We give it a higher 'weight' (cost) naturally because it's long, 
         # but agents HAVE to take it.
-        self.G.add_edge(bridge_start, bridge_end, weight=3.0, capacity=20, current_load=0, type="bridge")
-        self.G.add_edge(bridge_end, bridge_start, weight=3.0, capacity=20, current_load=0, type="bridge")
+        self._add_bridge(bridge_start, bridge_end, weight=3.0, capacity=20)
 
     def _add_two_way_street(self, u, v, weight=1.0):
         """Adds a standard street."""
         self.G.add_edge(u, v, weight=weight, capacity=10, current_load=0, type="street")
         self.G.add_edge(v, u, weight=weight, capacity=10, current_load=0, type="street")
 
-    def get_plotting_data(self):
-        """Export graph data for PyDeck (unchanged logic, adaptable to any graph)."""
-        lines = []
-        nodes = []
+    def _add_bridge(self, u, v, weight=3.0, capacity=20):
+        """Adds a two-way bridge between zones."""
+        self.G.add_edge(u, v, weight=weight, capacity=capacity, current_load=0, type="bridge")
+        self.G.add_edge(v, u, weight=weight, capacity=capacity, current_load=0, type="bridge")
+
+    def build_generated_city(self, zones=4, zone_rows=10, zone_cols=10, bridges_per_link=1,
+                             bridge_capacity=20, bridge_weight=3.0, street_drop=0.1,
+                             jitter=0.2, zone_gap=3, seed=0):
+        """
+        Procedural version of the 'Board Game' map for scaling studies.
+        Zones (alternating residential/commercial grids of zone_rows x zone_cols
+        intersections) are laid out on a square super-grid, zone_gap blocks apart.
+        Neighbouring zones are joined ONLY by `bridges_per_link` bridges, so every
+        zone boundary is a bottleneck. Total nodes = zones * zone_rows * zone_cols.
+
+        street_drop removes that fraction of the optional east-west streets (the
+        north-south streets plus row 0 always remain, so each zone stays connected);
+        jitter moves intersections by up to that many blocks. Same seed, same city.
+        """
+        rng = random.Random(seed)
+        base_lat = 12.9716
+        base_lon = 77.6412
+        lat_step = (self.block_size / 111320)
+        lon_step = (self.block_size / (40075000 * math.cos(math.radians(base_lat)) / 360))
+
+        grid_cols = math.ceil(math.sqrt(zones))
+        stride_r = zone_rows + zone_gap
+        stride_c = zone_cols + zone_gap
+
+        def node_id(z, r, col):
+            prefix = "res" if zone_types[z] == "residential" else "com"
+            return f"{prefix}{z}-{r}-{col}"
+
+        # --- 1. Zones and their intersections ---
+        zone_types = []
+        block_pos = {}   # node id -> (row, col) in blocks, used for street lengths
+        for z in range(zones):
+            zr, zc = divmod(z, grid_cols)
+            zone_type = "residential" if (zr + zc) % 2 == 0 else "commercial"
+            zone_types.append(zone_type)
+            nodes = []
+            for r in range(zone_rows):
+                for col in range(zone_cols):
+                    row_b = zr * stride_r + r + rng.uniform(-jitter, jitter)
+                    col_b = zc * stride_c + col + rng.uniform(-jitter, jitter)
+                    n = node_id(z, r, col)
+                    block_pos[n] = (row_b, col_b)
+                    nodes.append((n, {"pos": (base_lon + col_b * lon_step, base_lat + row_b * lat_step),
+                                      "type": zone_type, "zone": z}))
+            self.G.add_nodes_from(nodes)
 
+        def length(u, v):
+            (r1, c1), (r2, c2) = block_pos[u], block_pos[v]
+            return math.hypot(r1 - r2, c1 - c2)
+
+        # --- 2. Internal streets (a comb of always-kept streets keeps every zone connected) ---
+        for z in range(zones):
+            for r in range(zone_rows):
+                for col in range(zone_cols):
+                    curr = node_id(z, r, col)
+                    # Connect East (optional outside row 0)
+                    if col < zone_cols - 1 and (r == 0 or rng.random() >= street_drop):
+                        east = node_id(z, r, col + 1)
+                        self._add_two_way_street(curr, east, weight=length(curr, east))
+                    # Connect North
+                    if r < zone_rows - 1:
+                        north = node_id(z, r + 1, col)
+                        self._add_two_way_street(curr, north, weight=length(curr, north))
+
+        # --- 3. Bridges between neighbouring zones (the bottlenecks) ---
+        for z in range(zones):
+            zr, zc = divmod(z, grid_cols)
+            east_z = z + 1
+            if zc + 1 < grid_cols and east_z < zones:
+                for r in rng.sample(range(zone_rows), min(bridges_per_link, zone_rows)):
+                    self._add_bridge(node_id(z, r, zone_cols - 1), node_id(east_z, r, 0),
+                                     weight=bridge_weight, capacity=bridge_capacity)
+            north_z = z + grid_cols
+            if north_z < zones:
+                for col in rng.sample(range(zone_cols), min(bridges_per_link, zone_cols)):
+                    self._add_bridge(node_id(z, zone_rows - 1, col), node_id(north_z, 0, col),
+                                     weight=bridge_weight, capacity=bridge_capacity)
+
+    # --- Compiled (Array) View ---
+
+    def compile(self):
+        """
+        Freezes the networkx graph into integer-indexed NumPy arrays (CSR layout).
+        Node i is self.node_ids[i]. Edges are grouped by source node, so the
+        out-edges of node u are the ids out_ptr[u] .. out_ptr[u+1]-1.
+        Per-tick code reads and writes these arrays, never self.G.
+        Call again after changing the topology (loads are re-read from the graph).
+        """
+        self.node_ids = list(self.G.nodes())
+        self.node_index = {n: i for i, n in enumerate(self.node_ids)}
+
+        # Nodes: (lon, lat) per node, plus the zone type for rendering
+        self.node_pos = np.array([self.G.nodes[n]['pos'] for n in self.node_ids], dtype=np.float64).reshape(-1, 2)
+        self.node_type = [self.G.nodes[n].get('type', '') for n in self.node_ids]
+        # Zone number per node (zones only meet at bridges; used to shard the simulation)
+        self.node_zone = np.array([self.G.nodes[n].get('zone', 0) for n in self.node_ids], dtype=np.int32)
+
+        # Edges: DiGraph iterates adjacency in node order, so this is already grouped by source
+        src, dst, weight, capacity, load, is_bridge = [], [], [], [], [], []
         for u, v, data in self.G.edges(data=True):
-            start_pos = self.G.nodes[u]['pos'] 
-            end_pos = self.G.nodes[v]['pos']
-            
+            src.append(self.node_index[u])
+            dst.append(self.node_index[v])
+            weight.append(data.get('weight', 1.0))
+            capacity.append(data.get('capacity', 10))
+            load.append(data.get('current_load', 0))
+            is_bridge.append(data.get('type') == 'bridge')
+
+        self.edge_src = np.array(src, dtype=np.int32)
+        self.edge_dst = np.array(dst, dtype=np.int32)
+        self.edge_weight = np.array(weight, dtype=np.float64)
+        self.edge_capacity = np.array(capacity, dtype=np.int32)
+        self.edge_load = np.array(load, dtype=np.int32)
+        self.edge_is_bridge = np.array(is_bridge, dtype=bool)
+        self._link()
+
+    def _link(self, routing=None):
+        """
+        Everything derived from the node/edge arrays: counts, the flat projection, CSR
+        offsets, lookups, load statistics and the routing table. `routing` optionally
+        holds precomputed reverse adjacency and static route trees (see compiled_arrays).
+        """
+        self.num_nodes = len(self.node_ids)
+        self.num_edges = len(self.edge_src)
+        self.num_zones = int(self.node_zone.max()) + 1 if self.num_nodes else 0
+
+        # Local flat projection in meters (x east, y north) for distance queries
+        ref_lon, ref_lat = self.node_pos.min(axis=0) if self.num_nodes else (0.0, 0.0)
+        self.node_xy = np.empty_like(self.node_pos)
+        self.node_xy[:, 0] = (self.node_pos[:, 0] - ref_lon) * 111320 * math.cos(math.radians(ref_lat))
+        self.node_xy[:, 1] = (self.node_pos[:, 1] - ref_lat) * 111320
+
+        self.out_ptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        self.out_ptr[1:] = np.cumsum(np.bincount(self.edge_src, minlength=self.num_nodes))
+
+        # Plain-list copies for the scalar lookups (edge_id, path walks): list indexing is
+        # much faster than NumPy scalar indexing
+        self._out_ptr_list = self.out_ptr.tolist()
+        self._edge_dst_list = self.edge_dst.tolist()
+
+        self.recompute_load_stats()
+        self.load_listener = None   # Optional callback(edge ids) after any load change
+        self.route_queries = 0      # shortest_path calls (for benchmarks/profiling)
+        self.route_tree_builds = 0  # Dijkstra runs
+
+        # Reverse adjacency (who points INTO each node), used to grow route trees from a destination.
+        # Kept in edge-id order per node, so cached and freshly compiled cities route identically.
+        # Stored as CSR arrays; the per-node (source, edge) lists Dijkstra walks are only built
+        # with the first route tree, so loading a cached city needs no Python loop over its edges.
+        if routing is None:
+            routing = self._reverse_adjacency()
+        self._in_csr = (routing["in_ptr"], routing["in_src"], routing["in_edge"])
+        self._in_edges = None
+
+        trees = None
+        if "route_next" in routing:
+            trees = dict(enumerate(zip(routing["route_next"].tolist(), routing["route_dist"].tolist())))
+        self.build_routing_table(trees)
+
+    def _reverse_adjacency(self):
+        order = np.argsort(self.edge_dst, kind="stable")
+        in_ptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        in_ptr[1:] = np.cumsum(np.bincount(self.edge_dst, minlength=self.num_nodes))
+        return {"in_ptr": in_ptr, "in_src": self.edge_src[order], "in_edge": order.astype(np.int32)}
+
+    # Arrays that fully describe a compiled city (node_ids/node_type as string arrays)
+    COMPILED_ARRAYS = ("node_ids", "node_type", "node_pos", "node_zone", "edge_src", "edge_dst",
+                       "edge_weight", "edge_capacity", "edge_is_bridge")
+
+    def compiled_arrays(self):
+        """
+        The compiled city as a dict of NumPy arrays, for caching (see city_loader):
+        COMPILED_ARRAYS plus the reverse adjacency and, when the static route trees are
+        all built, their next-edge and distance tables. That only happens up to
+        ROUTING_EAGER_LIMIT nodes (the tables are num_nodes x num_nodes); bigger cities
+        cache no routes and build trees on demand after loading, like a fresh city.
+        """
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.COMPILED_ARRAYS}
+        arrays["node_ids"] = np.array([str(n) for n in self.node_ids])
+        arrays.update(self._reverse_adjacency())
+        if self.route_penalty is None and not self._routes_dirty and len(self._route_trees) == self.num_nodes:
+            next_edge, dist = zip(*(self._route_trees[t] for t in range(self.num_nodes)))
+            arrays["route_next"] = np.array(next_edge, dtype=np.int32).reshape(self.num_nodes, self.num_nodes)
+            arrays["route_dist"] = np.array(dist, dtype=np.float64).reshape(self.num_nodes, self.num_nodes)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, block_size_meters=100):
+        """
+        A city straight from compiled_arrays() output (e.g. memory-mapped from a cache file),
+        without building the networkx graph: G is rebuilt from the arrays on first access.
+        Arrays the simulation writes to (weights, capacities, loads) are copied.
+        """
+        self = cls.__new__(cls)
+        self.block_size = block_size_meters
+        self.route_penalty = None
+        self.route_version = 0
+        self._G = None
+        self.node_ids = arrays["node_ids"].tolist()
+        self.node_index = {n: i for i, n in enumerate(self.node_ids)}
+        self.node_type = arrays["node_type"].tolist()
+        self.node_pos = arrays["node_pos"]
+        self.node_zone = arrays["node_zone"]
+        self.edge_src = arrays["edge_src"]
+        self.edge_dst = arrays["edge_dst"]
+        self.edge_weight = np.array(arrays["edge_weight"], dtype=np.float64)
+        self.edge_capacity = np.array(arrays["edge_capacity"], dtype=np.int32)
+        self.edge_load = np.zeros(len(self.edge_src), dtype=np.int32)
+        self.edge_is_bridge = arrays["edge_is_bridge"]
+        self._link({name: arrays[name] for name in ("in_ptr", "in_src", "in_edge", "route_next", "route_dist")
+                    if name in arrays})
+        return self
+
+    @property
+    def G(self):
+        """The networkx graph (built from the compiled arrays on first use for cached cities)."""
+        if self._G is None:
+            self._G = self._graph_from_arrays()
+        return self._G
+
+    @G.setter
+    def G(self, graph):
+        self._G = graph
+
+    def _graph_from_arrays(self):
+        G = nx.DiGraph()
+        for n, pos, node_type, zone in zip(self.node_ids, self.node_pos.tolist(), self.node_type,
+                                           self.node_zone.tolist()):
+            G.add_node(n, pos=tuple(pos), type=node_type, zone=zone)
+        ids = self.node_ids
+        for u, v, w, cap, load, bridge in zip(self.edge_src.tolist(), self.edge_dst.tolist(), self.edge_weight.tolist(),
+                                              self.edge_capacity.tolist(), self.edge_load.tolist(),
+                                              self.edge_is_bridge.tolist()):
+            G.add_edge(ids[u], ids[v], weight=w, capacity=cap, current_load=load,
+                       type="bridge" if bridge else "street")
+        return G
+
+    def copy(self):
+        """
+        A branch of this city for what-if runs: shares the networkx graph, the topology
+        arrays and the cached route trees, but owns its loads, weights, capacities and
+        routing cache from here on. Only the loads and statistics are copied, so it is cheap.
+        (Weight/capacity setters also write G, which stays shared; treat G as export-only.)
+        """
+        other = copy.copy(self)
+        other.edge_load = self.edge_load.copy()
+        other.edge_weight = self.edge_weight.copy()
+        other.edge_capacity = self.edge_capacity.copy()
+        other.load_hist = self.load_hist.copy()
+        other._route_trees = dict(self._route_trees)
+        other.load_listener = None
+        return other
+
+    def edge_id(self, u, v):
+        """Integer id of the directed edge u->v, or -1 if there is none."""
+        dst = self._edge_dst_list
+        for e in range(self._out_ptr_list[u], self._out_ptr_list[u + 1]):
+            if dst[e] == v:
+                return e
+        return -1
+
+    def out_neighbors(self, u):
+        """Nodes reachable from u in one hop."""
+        return self.edge_dst[self.out_ptr[u]:self.out_ptr[u + 1]]
+
+    def sync_loads_to_graph(self):
+        """Copies the live edge loads back into the networkx 'current_load' attributes (for export)."""
+        for e in range(self.num_edges):
+            u = self.node_ids[self.edge_src[e]]
+            v = self.node_ids[self.edge_dst[e]]
+            self.G[u][v]['current_load'] = int(self.edge_load[e])
+
+    # --- Edge Loads (with running statistics) ---
+
+    def recompute_load_stats(self):
+        """Rebuilds the running load statistics from edge_load (O(edges); only needed after bulk edits)."""
+        loads = self.edge_load.astype(np.int64)
+        self.load_sum = int(loads.sum())
+        self.load_sq_sum = int((loads * loads).sum())
+        # load_hist[k] = number of edges currently carrying k rickshaws
+        self.load_hist = np.bincount(loads, minlength=16).astype(np.int64) if len(loads) else np.zeros(16, dtype=np.int64)
+
+    def _ensure_hist(self, max_load):
+        if max_load >= len(self.load_hist):
+            grown = np.zeros(max(2 * len(self.load_hist), max_load + 1), dtype=np.int64)
+            grown[:len(self.load_hist)] = self.load_hist
+            self.load_hist = grown
+
+    def add_load(self, e, delta):
+        """Changes the load on one edge (never below zero) and updates the running statistics."""
+        old = int(self.edge_load[e])
+        new = max(old + delta, 0)
+        self.edge_load[e] = new
+        self.load_sum += new - old
+        self.load_sq_sum += new * new - old * old
+        self._ensure_hist(new)
+        self.load_hist[old] -= 1
+        self.load_hist[new] += 1
+        if self.load_listener is not None:
+            self.load_listener((e,))
+
+    def add_loads(self, edges, delta):
+        """Batch version of add_load; `edges` may repeat. Loads must not go below zero."""
+        if len(edges) == 0:
+            return
+        touched, counts = np.unique(edges, return_counts=True)
+        old = self.edge_load[touched].astype(np.int64)
+        new = old + delta * counts
+        self.edge_load[touched] = new
+        self.load_sum += int(new.sum() - old.sum())
+        self.load_sq_sum += int((new * new).sum() - (old * old).sum())
+        self._ensure_hist(int(new.max()))
+        np.subtract.at(self.load_hist, old, 1)
+        np.add.at(self.load_hist, new, 1)
+        if self.load_listener is not None:
+            self.load_listener(touched.tolist())
+
+    def load_variance(self):
+        """Sample variance of the edge loads, from the running sums (O(1))."""
+        n = self.num_edges
+        if n < 2:
+            return 0.0
+        return (self.load_sq_sum - self.load_sum * self.load_sum / n) / (n - 1)
+
+    def speed_ratio_sum(self, traffic_penalty):
+        """
+        Sum over all loaded vehicles of 1 / (1 + load * penalty), i.e. each edge with
+        load k contributes k / (1 + k * penalty). Costs O(max load), not O(edges).
+        """
+        k = np.arange(len(self.load_hist))
+        return float(np.sum(self.load_hist * k / (1 + k * traffic_penalty)))
+
+    # --- Routing Table ---
+
+    def build_routing_table(self, trees=None):
+        """
+        Resets the shortest-path cache from the compiled edge arrays and takes a new
+        snapshot of the edge costs (static weights, or load-aware ones).
+        Small cities on static weights get every tree precomputed; otherwise the cache
+        fills on demand, one tree per destination for the current snapshot.
+        trees: static-weight trees computed earlier ({destination: (next_edge, dist)}), used as-is.
+        """
+        if self.route_penalty is None:
+            cost = self.edge_weight
+        else:
+            # Same slowdown rickshaws feel on a loaded edge
+            cost = self.edge_weight * (1 + self.edge_load * self.route_penalty)
+        self._route_cost = cost.tolist()
+        self.route_version += 1
+
+        self._route_trees = {}
+        self._routes_dirty = False
+
+        if trees is not None and self.route_penalty is None:
+            self._route_trees = trees
+        elif self.route_penalty is None and self.num_nodes <= c.ROUTING_EAGER_LIMIT:
+            for t in range(self.num_nodes):
+                self._route_trees[t] = self._build_route_tree(t)
+
+    def set_route_penalty(self, penalty):
+        """
+        Switches routing to load-aware costs, weight * (1 + load * penalty), or back to
+        static weights with None. Load-aware costs are a snapshot: they only follow the
+        traffic when refresh_route_costs() is called (the engine does so every K ticks).
+        """
+        self.route_penalty = penalty
+        self.build_routing_table()
+
+    def refresh_route_costs(self):
+        """New cost snapshot from the current loads; cached routes are dropped and rebuilt on demand."""
+        self.build_routing_table()
+
+    def invalidate_routes(self):
+        """Marks the routing table stale. Call after changing edge weights."""
+        self._routes_dirty = True
+
+    def set_bridge_capacity(self, capacity):
+        """
+        Sets the capacity of every bridge edge. The graph is only updated if it has been
+        built (a cached city builds it from the arrays later, values included).
+        """
+        self.edge_capacity[self.edge_is_bridge] = capacity
+        if self._G is not None:
+            for e in np.flatnonzero(self.edge_is_bridge).tolist():
+                u = self.node_ids[self.edge_src[e]]
+                v = self.node_ids[self.edge_dst[e]]
+                self._G[u][v]['capacity'] = capacity
+
+    def set_edge_weight(self, e, weight):
+        """Changes the routing cost of one directed edge (and in the graph, if built)."""
+        self.edge_weight[e] = weight
+        if self._G is not None:
+            u = self.node_ids[self.edge_src[e]]
+            v = self.node_ids[self.edge_dst[e]]
+            self._G[u][v]['weight'] = weight
+        self.invalidate_routes()
+
+    def _build_route_tree(self, t):
+        """
+        Dijkstra on the reversed graph from destination t.
+        Returns (next_edge, dist): next_edge[u] is the edge to take from u towards t.
+        """
+        self.route_tree_builds += 1
+        if self._in_edges is None:
+            in_ptr, in_src, in_edge = (a.tolist() for a in self._in_csr)
+            self._in_edges = [list(zip(in_src[in_ptr[v]:in_ptr[v + 1]], in_edge[in_ptr[v]:in_ptr[v + 1]]))
+                              for v in range(self.num_nodes)]
+        cost = self._route_cost
+        dist = [math.inf] * self.num_nodes
+        next_edge = [-1] * self.num_nodes
+        dist[t] = 0.0
+        heap = [(0.0, t)]
+
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]: continue
+            for u, e in self._in_edges[v]:
+                nd = d + cost[e]
+                if nd < dist[u]:
+                    dist[u] = nd
+                    next_edge[u] = e
+                    heapq.heappush(heap, (nd, u))
+
+        return next_edge, dist
+
+    def _route_tree(self, t):
+        if self._routes_dirty:
+            self.build_routing_table()
+        tree = self._route_trees.get(t)
+        if tree is None:
+            tree = self._build_route_tree(t)
+            self._route_trees[t] = tree
+        return tree
+
+    def shortest_path(self, source, target):
+        """
+        Weighted shortest path as a list of node indices (same contract as nx.shortest_path).
+        Walks the cached next-hop table, so it costs O(path length).
+        """
+        self.route_queries += 1
+        next_edge, dist = self._route_tree(target)
+        if dist[source] == math.inf:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+
+        edge_dst = self._edge_dst_list
+        u = source
+        path = [u]
+        while u != target:
+            u = edge_dst[next_edge[u]]
+            path.append(u)
+        return path
+
+    def route_distance(self, source, target):
+        """Weighted network distance between two nodes (inf if unreachable)."""
+        next_edge, dist = self._route_tree(target)
+        return dist[source]
+
+    def distances_to(self, target):
+        """Weighted network distance from every node to target (list indexed by node)."""
+        next_edge, dist = self._route_tree(target)
+        return dist
+
+    def get_plotting_data(self):
+        """Export graph data for PyDeck (see plotting_data)."""
+        return plotting_data(self)
+
+def plotting_data(city):
+    """
+    Graph data for PyDeck, one line per edge in edge-id order (so line e matches
+    edge_load[e]). Reads only the compiled arrays (node_pos, node_ids, edge_src,
+    edge_dst, edge_is_bridge), so it also works on a replay.ReplayCity. The layout
+    never changes, so callers should build it once and only update colors/loads afterwards.
+    """
+    pos = city.node_pos.tolist()
+    lines = []
+    for src, dst, is_bridge in zip(city.edge_src.tolist(), city.edge_dst.tolist(), city.edge_is_bridge.tolist()):
+        lines.append({
+            "source": pos[src],
+            "target": pos[dst],
             # Color bridges differently (Cyan)
-            color = [100, 100, 100]
-            if data.get('type') == 'bridge':
-                color = [0, 200, 255] 
-            
-            lines.append({
-                "source": start_pos,
-                "target": end_pos,
-                "color": color,
-                "width": 10
-            })
-
-        for n, data in self.G.nodes(data=True):
-            nodes.append({
-                "pos": data['pos'],
-                "id": n
-            })
-
-        return lines, nodes
\ No newline at end of file
+            "color": [0, 200, 255] if is_bridge else [100, 100, 100],
+            "width": 10
+        })
+
+    nodes = [{"pos": p, "id": n} for p, n in zip(pos, city.node_ids)]
+
+    return lines, nodes
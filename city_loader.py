@@ -0,0 +1,256 @@
+# city_loader.py
+import ast
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import networkx as nx
+import numpy as np
+from city import CityGraph
+
+# --- CACHE FILE LAYOUT ---
+# MAGIC | compiled arrays (raw, 8-byte aligned) | footer JSON | trailer (footer offset + MAGIC)
+# One file per source file content; the name carries the content hash.
+MAGIC = b"USWCITY1"
+TRAILER = struct.Struct("<Q8s")
+LOADER_VERSION = 1  # Bump when parsing or compiling changes, so old caches are ignored
+
+BRIDGE_VALUES = {"yes", "true", "1", "viaduct", "aqueduct", "boardwalk", "cantilever", "covered", "movable"}
+ONEWAY_VALUES = {"yes", "true", "1"}
+
+# --- Reading Source Files ---
+
+def _truthy(value, accepted):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value).strip().lower() in accepted
+
+def _first_number(value, default):
+    """Numbers from OSM tags: 2, "2", "2;3", "['2', '3']" -> the first one (default if none)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                return default
+            return _first_number(value[0], default) if value else default
+        try:
+            return float(text.split(";")[0])
+        except ValueError:
+            return default
+    if isinstance(value, list) and value:
+        return _first_number(value[0], default)
+    return default
+
+def _node_lonlat(data):
+    """(lon, lat) of a GraphML node: OSMnx-style x/y, lon/lat, or a "lon,lat" pos string."""
+    if "x" in data and "y" in data:
+        return float(data["x"]), float(data["y"])
+    if "lon" in data and "lat" in data:
+        return float(data["lon"]), float(data["lat"])
+    pos = data.get("pos")
+    if isinstance(pos, str):
+        lon, lat = pos.strip("()[] ").split(",")[:2]
+        return float(lon), float(lat)
+    if pos is not None:
+        return float(pos[0]), float(pos[1])
+    raise ValueError(f"Node without coordinates: {data}")
+
+def _meters(p, q):
+    """Equirectangular distance between two (lon, lat) points (fine at street scale)."""
+    lat = math.radians((p[1] + q[1]) / 2)
+    dx = (q[0] - p[0]) * 111320 * math.cos(lat)
+    dy = (q[1] - p[1]) * 111320
+    return math.hypot(dx, dy)
+
+def _edge_attrs(data, length_m, block_size):
+    """Maps street-network edge tags onto the city schema (weight in blocks, capacity, type)."""
+    bridge = data.get("type") == "bridge" or _truthy(data.get("bridge"), BRIDGE_VALUES)
+    length = _first_number(data.get("length"), length_m)
+    default_capacity = 20 if bridge else 10
+    capacity = data.get("capacity")
+    if capacity is None:
+        # 10 rickshaws per lane, like the hand-made streets
+        capacity = 10 * _first_number(data.get("lanes"), default_capacity / 10)
+    return {
+        "weight": max(length / block_size, 1e-6),
+        "capacity": int(_first_number(capacity, default_capacity)),
+        "current_load": 0,
+        "type": "bridge" if bridge else "street",
+    }
+
+def _node_attrs(pos, data):
+    node_type = data.get("type", "")
+    return {"pos": pos, "type": node_type if node_type in ("residential", "commercial") else "",
+            "zone": int(_first_number(data.get("zone"), 0))}
+
+def _add_edge(G, u, v, attrs):
+    """Adds u->v, keeping the cheaper one when a street appears twice (multigraph exports)."""
+    old = G.get_edge_data(u, v)
+    if old is None or attrs["weight"] < old["weight"]:
+        G.add_edge(u, v, **attrs)
+
+def read_graphml(path, block_size=100):
+    """
+    A street network saved as GraphML (e.g. by OSMnx) as a DiGraph in the CityGraph schema.
+    Undirected files get both directions; parallel edges collapse to the shortest.
+    """
+    raw = nx.read_graphml(path)
+    G = nx.DiGraph()
+    for n, data in raw.nodes(data=True):
+        G.add_node(n, **_node_attrs(_node_lonlat(data), data))
+    for u, v, data in raw.edges(data=True):
+        attrs = _edge_attrs(data, _meters(G.nodes[u]["pos"], G.nodes[v]["pos"]), block_size)
+        _add_edge(G, u, v, attrs)
+        if not raw.is_directed():
+            _add_edge(G, v, u, attrs)
+    return G
+
+def read_geojson(path, block_size=100):
+    """
+    A street network as a GeoJSON FeatureCollection of LineStrings/MultiLineStrings
+    (one street per feature, properties as OSM tags) as a DiGraph in the CityGraph schema.
+    Every vertex becomes a node; lines sharing a coordinate share the node. Streets are
+    two-way unless tagged oneway ("-1" means against the drawing direction). Point
+    features with a "type" or "zone" property tag the node at their coordinate.
+    """
+    with open(path) as f:
+        collection = json.load(f)
+
+    G = nx.DiGraph()
+    node_at = {}
+
+    def node(coord):
+        key = (round(coord[0], 7), round(coord[1], 7))
+        n = node_at.get(key)
+        if n is None:
+            n = node_at[key] = f"n{len(node_at)}"
+            G.add_node(n, pos=key, type="", zone=0)
+        return n
+
+    points = []
+    for feature in collection.get("features", []):
+        geometry = feature.get("geometry") or {}
+        props = feature.get("properties") or {}
+        kind = geometry.get("type")
+        if kind == "Point":
+            points.append((geometry["coordinates"], props))
+            continue
+        if kind == "LineString":
+            lines = [geometry["coordinates"]]
+        elif kind == "MultiLineString":
+            lines = geometry["coordinates"]
+        else:
+            continue
+
+        oneway = props.get("oneway")
+        forward = oneway is None or str(oneway).strip() != "-1"
+        backward = not _truthy(oneway, ONEWAY_VALUES) or not forward
+        for coords in lines:
+            for a, b in zip(coords, coords[1:]):
+                u, v = node(a), node(b)
+                if u == v:
+                    continue
+                # Tag lengths are per street, not per segment, so segments use their own geometry
+                attrs = _edge_attrs(dict(props, length=None), _meters(G.nodes[u]["pos"], G.nodes[v]["pos"]),
+                                    block_size)
+                if forward: _add_edge(G, u, v, attrs)
+                if backward: _add_edge(G, v, u, attrs)
+
+    for coord, props in points:
+        n = node_at.get((round(coord[0], 7), round(coord[1], 7)))
+        if n is not None:
+            G.nodes[n].update(_node_attrs(G.nodes[n]["pos"], props))
+    return G
+
+def largest_component(G):
+    """
+    The largest strongly connected part of G: real networks have dead ends and
+    one-way traps that would leave some trips without a route.
+    """
+    if G.number_of_nodes() == 0:
+        return G
+    keep = max(nx.strongly_connected_components(G), key=len)
+    return G.subgraph(keep).copy()
+
+# --- Cache ---
+
+def _content_key(path, block_size, strongly_connected):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{LOADER_VERSION}:{block_size}:{strongly_connected}:".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_cache(path, arrays):
+    """Writes compiled city arrays to one file (via a temp file, so readers never see half of it)."""
+    index = {}
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            f.write(b"\0" * (-f.tell() % 8))
+            index[name] = [f.tell(), array.dtype.str, list(array.shape)]
+            f.write(array.tobytes())
+        offset = f.tell()
+        f.write(json.dumps(index).encode())
+        f.write(TRAILER.pack(offset, MAGIC))
+    os.replace(tmp, path)
+
+def read_cache(path):
+    """Compiled city arrays as zero-copy views into the memory-mapped cache file (None if unreadable)."""
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None  # Empty file
+    offset, magic = TRAILER.unpack(buf[-TRAILER.size:])
+    if buf[:len(MAGIC)] != MAGIC or magic != MAGIC:
+        return None
+    index = json.loads(buf[offset:len(buf) - TRAILER.size])
+    return {name: np.frombuffer(buf, dtype=dtype, count=int(np.prod(shape)), offset=start).reshape(shape)
+            for name, (start, dtype, shape) in index.items()}
+
+def load_city(path, block_size=100, cache_dir=None, strongly_connected=True):
+    """
+    A CityGraph from a local .graphml or .geojson/.json street network.
+    The compiled arrays (and, for small cities, every static route tree) are cached
+    in `cache_dir` (default: a .city_cache folder next to the file) under the file's
+    content hash; later loads memory-map that cache instead of parsing, and build
+    the networkx graph only if something asks for city.G.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), ".city_cache")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f"{stem}-{_content_key(path, block_size, strongly_connected)}.city")
+
+    # 1. Warm start
+    if os.path.exists(cache_path):
+        arrays = read_cache(cache_path)
+        if arrays is not None:
+            return CityGraph.from_arrays(arrays, block_size)
+
+    # 2. Cold start: parse, compile, cache
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".graphml":
+        G = read_graphml(path, block_size)
+    elif ext in (".geojson", ".json"):
+        G = read_geojson(path, block_size)
+    else:
+        raise ValueError(f"Unknown street network format '{ext}' (use .graphml or .geojson)")
+    if strongly_connected:
+        G = largest_component(G)
+    if G.number_of_nodes() < 2:
+        raise ValueError(f"{path} holds no usable street network")
+
+    city = CityGraph(block_size, graph=G)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_cache(cache_path, city.compiled_arrays())
+    return city
@@ -7,6 +7,8 @@ FPS = 60                   # Keep this high for smooth rendering
 BG_COLOR = (20, 20, 20)
 STREET_COLOR = (60, 60, 60)
 NODE_COLOR = (100, 100, 100)
+MAX_DIRTY_RECTS = 2000     # Above this many changed areas per frame, redraw the whole window
+JAM_LOAD = 2               # Edges with more than this many rickshaws are drawn as jammed
 
 # --- AGENT COLORS ---
 COLOR_RICKSHAW_EMPTY = (0, 255, 128)
@@ -22,10 +24,17 @@ RICKSHAW_SPEED_BASE = 0.2
 TRAFFIC_PENALTY = 0.8         
 SPAWN_RATE = 0.02
 
+# Mesoscopic mode (meso_engine): vehicles per second an edge discharges, per unit of capacity
+MESO_OUTFLOW = 0.05
+
+# --- ROUTING ---
+# Cities up to this many nodes get the full shortest-path table built up front
+ROUTING_EAGER_LIMIT = 500
+
 # --- DRONE SETTINGS ---
 # CHANGE THIS: Scale drone speed down too (was 2.0, now 0.4)
 DRONE_SPEED = 0.4             
-DRONE_VISION_RADIUS = 150.0
+DRONE_VISION_RADIUS = 150.0      # Meters; police see every node this close
 DRONE_INTERCEPT_DIST = 10.0
 FINE_DURATION = 3.0
 
@@ -0,0 +1,125 @@
+# dashboard.py
+# Browser dashboard for long runs:  streamlit run dashboard.py -- --seed 1
+#                        or replay:  streamlit run dashboard.py -- --replay run.rec
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+import streamlit as st
+import config as c
+from city import plotting_data
+from logic_engine import SimulationEngine
+from metrics_feed import MetricsFeed, EngineRunner, ReplayRunner
+from recorder import Recording
+from replay import ReplayPlayer
+
+HISTORY = 2000  # Metric points kept for the charts
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Streamlit dashboard for a running or recorded simulation.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--dispatch", type=int, default=None, metavar="K")
+    parser.add_argument("--replay", default=None, metavar="PATH", help="Show a recording instead of a live run")
+    parser.add_argument("--publish-every", type=int, default=10, help="Ticks between snapshots")
+    parser.add_argument("--refresh", type=float, default=0.5, help="Seconds between browser updates")
+    return parser.parse_args()
+
+@st.cache_resource
+def start_source(seed, dispatch, replay, publish_every):
+    """
+    Starts the simulation (or replay) thread once per server process, however many
+    browser sessions attach. Returns the feed and the static map layer.
+    """
+    feed = MetricsFeed()
+    if replay:
+        player = ReplayPlayer(Recording(replay))
+        runner = ReplayRunner(player, feed, publish_every)
+        city, bounds = player.city, player.bounds
+    else:
+        engine = SimulationEngine(seed=seed, dispatch_interval=dispatch)
+        runner = EngineRunner(engine, feed, 1.0 / c.FPS, publish_every, realtime=True)
+        city, bounds = engine.city, engine.bounds
+
+    # The road layout never changes: export it once, later refreshes only recolor edges
+    lines, nodes = plotting_data(city)
+    runner.start()
+    return feed, pd.DataFrame(lines), bounds
+
+def edge_color(lines, edges):
+    """Jam color for loaded edges, the base color otherwise (rows `edges` only)."""
+    jammed = (lines.loc[edges, "load"] > c.JAM_LOAD).to_numpy()
+    for k, channel in enumerate("rgb"):
+        lines.loc[edges, channel] = np.where(jammed, c.COLOR_JAM[k], lines.loc[edges, "base_" + channel])
+
+def main():
+    args = parse_args()
+    st.set_page_config(page_title="Urban Swarm", layout="wide")
+    st.title("Urban Swarm: Homeostasis Monitor")
+    feed, static_lines, bounds = start_source(args.seed, args.dispatch, args.replay, args.publish_every)
+
+    # Per browser session: own copy of the edge table, updated from the feed's deltas
+    state = st.session_state
+    if "lines" not in state:
+        base = np.array(static_lines["color"].tolist()).reshape(-1, 3)
+        state.lines = static_lines.drop(columns="color").assign(
+            load=0, r=base[:, 0], g=base[:, 1], b=base[:, 2],
+            base_r=base[:, 0], base_g=base[:, 1], base_b=base[:, 2])
+        state.seq = 0
+        state.history = []
+
+    min_lat, max_lat, min_lon, max_lon = bounds
+    view = pdk.ViewState(latitude=(min_lat + max_lat) / 2, longitude=(min_lon + max_lon) / 2, zoom=15)
+    stats_slot = st.empty()
+    map_slot = st.empty()
+    chart_slot = st.empty()
+
+    while True:
+        snapshots, gap = feed.since(state.seq)
+        if snapshots:
+            lines = state.lines
+            if gap:
+                # Fell behind the ring buffer: take the full load vector once
+                _, loads = feed.full_state()
+                lines["load"] = loads
+                edge_color(lines, lines.index)
+            else:
+                for snap in snapshots:
+                    lines.loc[snap["changed_edges"], "load"] = snap["changed_loads"]
+                    edge_color(lines, snap["changed_edges"])
+            state.seq = snapshots[-1]["seq"]
+            state.history.extend({k: s[k] for k in ("time", "efficiency", "entropy", "waiting_passengers")}
+                                 for s in snapshots)
+            del state.history[:-HISTORY]
+            latest = snapshots[-1]
+
+            # 1. Headline numbers
+            with stats_slot.container():
+                cols = st.columns(4)
+                cols[0].metric("System health", f"{latest['efficiency']:.1f}%")
+                cols[1].metric("Entropy (var)", f"{latest['entropy']:.2f}")
+                cols[2].metric("Waiting passengers", latest["waiting_passengers"])
+                cols[3].metric("Deliveries", latest["deliveries"])
+
+            # 2. Map: roads colored by load, agents on top
+            agents = pd.DataFrame(latest["positions"], columns=["lon", "lat"])
+            agents["color"] = [[255, 255, 255] if kind else
+                               list(c.COLOR_RICKSHAW_FULL if full else c.COLOR_RICKSHAW_EMPTY)
+                               for kind, full in zip(latest["kind"].tolist(), latest["carrying"].tolist())]
+            map_slot.pydeck_chart(pdk.Deck(
+                layers=[
+                    pdk.Layer("LineLayer", lines, get_source_position="source", get_target_position="target",
+                              get_color="[r, g, b]", get_width="width"),
+                    pdk.Layer("ScatterplotLayer", agents, get_position=["lon", "lat"], get_fill_color="color",
+                              get_radius=8),
+                ],
+                initial_view_state=view,
+                map_style=None,
+            ))
+
+            # 3. Metric history
+            chart_slot.line_chart(pd.DataFrame(state.history).set_index("time")[["efficiency", "entropy"]])
+
+        time.sleep(args.refresh)
+
+main()
@@ -0,0 +1,136 @@
+# dispatcher.py
+import numpy as np
+
+def solve_assignment(cost):
+    """
+    Minimum-cost bipartite assignment (Hungarian method, shortest augmenting paths)
+    for a rectangular cost matrix. Returns (rows, cols) index arrays of the matched pairs.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    # 1-based potentials/matching as in the classic formulation; column 0 is a sentinel
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)    # p[j] = row matched to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # Flip the augmenting path
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+class Dispatcher:
+    """
+    Central dispatch: every `interval` ticks, matches all idle rickshaws to waiting
+    passengers in one assignment solve, using network (shortest-path) distances.
+    Matched passengers are reserved for their rickshaw until pickup.
+    """
+    def __init__(self, engine, interval=10, max_batch=300):
+        self.engine = engine
+        self.interval = max(1, interval)
+        self.max_batch = max_batch
+        self.ticks = 0
+        self.assignments = {}   # rickshaw store index -> reserved Passenger
+        self.reserved = set()   # ids of reserved passengers
+
+    def step(self):
+        """Called once per engine tick; solves on every `interval`-th call."""
+        self.ticks += 1
+        if self.ticks % self.interval == 0:
+            self.dispatch()
+
+    def dispatch(self):
+        engine = self.engine
+        city = engine.city
+
+        # 1. Collect idle rickshaws and unreserved passengers (oldest first)
+        idle = [a for a in engine.rickshaws if a.state == "IDLE" and not a.passenger]
+        waiting = [p for p in engine.passengers if p.id not in self.reserved]
+        if not idle or not waiting:
+            return
+        waiting.sort(key=lambda p: p.id)
+        waiting = waiting[:self.max_batch]
+        idle = idle[:self.max_batch]
+
+        # 2. Network distance from every rickshaw to every passenger (one tree per passenger node)
+        sources = np.array([a.current_node for a in idle], dtype=np.int64)
+        cost = np.empty((len(idle), len(waiting)))
+        trees = {}
+        for j, pax in enumerate(waiting):
+            dist = trees.get(pax.node)
+            if dist is None:
+                dist = trees[pax.node] = np.asarray(city.distances_to(pax.node))
+            cost[:, j] = dist[sources]
+
+        # Unreachable pairs get a prohibitive cost and are dropped after the solve
+        unreachable = ~np.isfinite(cost)
+        if unreachable.all():
+            return
+        big = (cost[~unreachable].max() + 1) * (len(idle) + len(waiting))
+        cost[unreachable] = big
+
+        # 3. Solve and push assignments to the agents
+        rows, cols = solve_assignment(cost)
+        for r, j in zip(rows.tolist(), cols.tolist()):
+            if unreachable[r, j]:
+                continue
+            agent, pax = idle[r], waiting[j]
+            self.assignments[agent.idx] = pax
+            self.reserved.add(pax.id)
+            agent.destination_node = pax.node
+            agent.state = "HUNTING"
+            agent._recalculate_path()
+
+    def claim(self, agent):
+        """Hands a rickshaw its reserved passenger once it stands on their node."""
+        pax = self.assignments.get(agent.idx)
+        if pax is None or pax.node != agent.current_node:
+            return None
+        del self.assignments[agent.idx]
+        self.reserved.discard(pax.id)
+        self.engine.passengers.remove(pax)
+        return pax
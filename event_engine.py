@@ -0,0 +1,248 @@
+# event_engine.py
+import heapq
+import numpy as np
+import config as c
+from logic_engine import SimulationEngine
+from agent_store import KIND_RICKSHAW
+
+# --- EVENT KINDS ---
+ARRIVAL = 0      # An agent reaches the end of its edge
+WAKE = 1         # An agent without an edge gets to decide again
+SPAWN = 2        # A passenger appears (Poisson process)
+POLICE_SCAN = 3  # Patrolling drones look around / pursuers update their target
+DISPATCH = 4     # Central dispatcher solve (only in dispatch mode)
+ROUTE_REFRESH = 5  # New route cost snapshot (only with load-aware routing)
+
+class EventSimulationEngine(SimulationEngine):
+    """
+    Discrete-event alternative to fixed-dt stepping. Between node arrivals an agent's
+    speed only changes when the load on its edge changes, so instead of polling every
+    agent every frame we keep a priority queue of predicted arrival times and only
+    re-predict the agents on edges whose load just changed.
+
+    update(dt) advances the clock by dt (any size) and leaves the same per-agent state
+    (AgentStore rows, with progress synced to the current time) as SimulationEngine,
+    so Visualizer and the metrics work unchanged.
+    """
+    def __init__(self, run_config=None, city=None, police_scan_interval=0.25, **overrides):
+        super().__init__(run_config, city, **overrides)
+        self.now = 0.0
+        self.events_processed = 0
+
+        # The tick engine rolls/retargets once per frame at config.FPS; we keep the same rates
+        self.nominal_dt = 1.0 / c.FPS
+        self.police_scan_interval = police_scan_interval
+        scans_per_frame = police_scan_interval / self.nominal_dt
+        for cop in self.police:
+            cop.ticket_chance = 1 - (1 - cop.ticket_chance) ** scans_per_frame
+
+        # Per-agent prediction state (indexed like the AgentStore rows)
+        n = self.store.capacity
+        self.speed = np.zeros(n)        # Edge fractions per second on the current edge
+        self.synced_at = np.zeros(n)    # Time at which store.progress was last brought up to date
+        self.version = np.zeros(n, dtype=np.int64)
+        self.edge_of = {}               # row -> edge it is registered on
+        self.on_edge = {}               # edge -> set of rows travelling on it
+        self.dirty = set()              # rows whose prediction must be recomputed
+
+        self.queue = []
+        self._seq = 0
+
+        # Hear about every load and path change
+        self.city.load_listener = self._on_load_change
+        self.store.path_listener = self._on_path_change
+
+        # Every agent decides at t=0; passengers, scans and dispatch start their clocks
+        for i in range(self.store.size):
+            self._edge_changed(i)
+            self._push(0.0, WAKE, i, self.version[i])
+        self._schedule_spawn()
+        self._push(0.0, POLICE_SCAN)
+        if self.dispatcher:
+            self._push(self.dispatcher.interval * self.nominal_dt, DISPATCH)
+        if self.route_refresh:
+            self._push(self.route_refresh * self.nominal_dt, ROUTE_REFRESH)
+
+    # --- Clock ---
+
+    def update(self, dt):
+        """
+        Advances simulated time by dt, processing every event that falls inside it.
+        With a profiler attached, event handling is split between the rickshaw phases
+        (their laps fire inside the handlers) and "move" for everything else.
+        """
+        prof = self.profiler
+        if prof is not None: prof.start_tick(self)
+        if self.store.event_log is not None:
+            self.store.event_log.tick = self.ticks
+        self.run_until(self.now + dt)
+        self.sync_positions()
+        if prof is not None: prof.lap("move")
+        self.calculate_metrics()
+        if prof is not None:
+            prof.lap("metrics")
+            prof.end_tick(self)
+        self.ticks += 1
+        if self.recorder is not None:
+            self.recorder.record(self, dt)
+
+    def run_until(self, t_end):
+        queue = self.queue
+        while queue and queue[0][0] <= t_end:
+            t, _, kind, i, version = heapq.heappop(queue)
+            if kind in (ARRIVAL, WAKE) and version != self.version[i]:
+                continue  # Superseded prediction
+            self.now = t
+            self.events_processed += 1
+
+            if kind == ARRIVAL:
+                self._handle_arrival(i)
+            elif kind == WAKE:
+                self._serve(i)
+            elif kind == SPAWN:
+                self._handle_spawn()
+            elif kind == POLICE_SCAN:
+                self._handle_police_scan()
+            elif kind == DISPATCH:
+                self.dispatcher.dispatch()
+                self._push(self.now + self.dispatcher.interval * self.nominal_dt, DISPATCH)
+            elif kind == ROUTE_REFRESH:
+                self.city.refresh_route_costs()
+                self._push(self.now + self.route_refresh * self.nominal_dt, ROUTE_REFRESH)
+
+            self._refresh_dirty()
+        self.now = t_end
+
+    def sync_positions(self):
+        """Brings every moving agent's progress up to the current time (vectorized)."""
+        self._fit_rows()
+        n = self.store.size
+        moving = self.store.current_edge[:n] >= 0
+        elapsed = self.now - self.synced_at[:n]
+        progress = self.store.progress[:n]
+        progress[moving] = np.minimum(progress[moving] + self.speed[:n][moving] * elapsed[moving], 1.0)
+        self.synced_at[:n] = self.now
+
+    # --- Event Handlers ---
+
+    def _handle_arrival(self, i):
+        store = self.store
+        self._sync(i)
+        store.progress[i] = 1.0
+        store.settle_arrivals(np.array([i]), self.city)
+        self._edge_changed(i)
+        self._serve(i)
+
+    def _serve(self, i):
+        """Runs the usual per-agent decision logic for row i."""
+        agent = self.store.views[i]
+        if self.store.kind[i] == KIND_RICKSHAW:
+            self.serve_rickshaw(agent)
+        else:
+            agent.decide_move()
+            self._sync_pursuit(agent)
+            agent.enforce_law()
+        self.dirty.add(i)
+
+    def _handle_spawn(self):
+        self.add_random_passenger()
+        # Free rickshaws re-evaluate, as they would on the next tick
+        for agent in self.rickshaws:
+            if not agent.passenger:
+                self._serve(agent.idx)
+        self._schedule_spawn()
+
+    def _handle_police_scan(self):
+        for cop in self.police:
+            self._sync(cop.idx)
+            cop.decide_move()
+            self._sync_pursuit(cop)
+            cop.enforce_law()
+            self.dirty.add(cop.idx)
+        self._push(self.now + self.police_scan_interval, POLICE_SCAN)
+
+    def _sync_pursuit(self, cop):
+        # Capture compares progress values, so both sides must be current
+        if cop.target_agent is not None:
+            self._sync(cop.idx)
+            self._sync(cop.target_agent.idx)
+
+    def _schedule_spawn(self):
+        # Per-frame spawn chance at config.FPS -> Poisson rate per second
+        rate = self.cfg.spawn_rate / self.nominal_dt
+        if rate > 0:
+            self._push(self.now + self.rng["spawn"].expovariate(rate), SPAWN)
+
+    # --- Predictions ---
+
+    def _fit_rows(self):
+        """Grows the per-row arrays if agents were added after construction."""
+        n = self.store.capacity
+        if len(self.speed) < n:
+            extra = n - len(self.speed)
+            self.speed = np.concatenate([self.speed, np.zeros(extra)])
+            self.synced_at = np.concatenate([self.synced_at, np.full(extra, self.now)])
+            self.version = np.concatenate([self.version, np.zeros(extra, dtype=np.int64)])
+
+    def _sync(self, i):
+        self._fit_rows()
+        store = self.store
+        if store.current_edge[i] >= 0:
+            store.progress[i] = min(store.progress[i] + self.speed[i] * (self.now - self.synced_at[i]), 1.0)
+        self.synced_at[i] = self.now
+
+    def _edge_changed(self, i):
+        """Keeps the edge -> agents registry in step with row i's current edge."""
+        self._fit_rows()
+        self.synced_at[i] = self.now
+        old = self.edge_of.get(i, -1)
+        new = int(self.store.current_edge[i])
+        if old != new:
+            if old >= 0:
+                riders = self.on_edge[old]
+                riders.discard(i)
+                if not riders:
+                    del self.on_edge[old]
+            if new >= 0:
+                self.on_edge.setdefault(new, set()).add(i)
+            self.edge_of[i] = new
+        self.dirty.add(i)
+
+    def _on_path_change(self, i):
+        self._edge_changed(i)
+
+    def _on_load_change(self, edges):
+        # Rickshaws on these edges keep their old speed up to now, then get a new prediction
+        kind = self.store.kind
+        for e in edges:
+            for j in self.on_edge.get(e, ()):
+                if kind[j] == KIND_RICKSHAW:
+                    self._sync(j)
+                    self.dirty.add(j)
+
+    def _refresh_dirty(self):
+        store = self.store
+        cfg = self.cfg
+        loads = self.city.edge_load
+        self._fit_rows()
+        for i in sorted(self.dirty):
+            self.version[i] += 1
+            e = store.current_edge[i]
+            if e < 0:
+                # Nowhere to go yet: look again after one nominal frame
+                self.speed[i] = 0.0
+                self._push(self.now + self.nominal_dt, WAKE, i, self.version[i])
+                continue
+            if store.kind[i] == KIND_RICKSHAW:
+                # Formula: Higher load = Lower speed
+                speed = cfg.rickshaw_speed_base / (1 + loads[e] * cfg.traffic_penalty)
+            else:
+                speed = cfg.police_speed
+            self.speed[i] = speed
+            remaining = max(1.0 - store.progress[i], 0.0)
+            self._push(self.now + remaining / speed, ARRIVAL, i, self.version[i])
+        self.dirty.clear()
+
+    def _push(self, t, kind, i=-1, version=0):
+        self._seq += 1
+        heapq.heappush(self.queue, (t, self._seq, kind, i, int(version)))
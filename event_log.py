@@ -0,0 +1,118 @@
+# event_log.py
+import queue
+import struct
+import threading
+import zlib
+import numpy as np
+
+# --- EVENT KINDS ---
+# Field use per kind:           agent        other         node                   value
+SIGHTING = 0       # A drone flags a speeder:   police id    speeder id    speeder's node         load on its edge
+PURSUIT_START = 1  # Pursuit begins:            police id    speeder id    intercept node         0
+TICKET = 2         # Speeder caught:            police id    speeder id    node                   fine taken
+PICKUP = 3         # Passenger boards:          rickshaw id  passenger id  node                   0
+DROPOFF = 4        # Passenger delivered:       rickshaw id  passenger id  node                   fare paid
+PATH_RECALC = 5    # Route computed:            agent id     -1            destination (or -1)    nodes in path
+EVENT_NAMES = ("sighting", "pursuit_start", "ticket", "pickup", "dropoff", "path_recalc")
+
+# One fixed-size record per event (25 bytes before compression)
+EVENT_DTYPE = np.dtype([("tick", "<i8"), ("kind", "u1"), ("agent", "<i4"), ("other", "<i4"),
+                        ("node", "<i4"), ("value", "<i4")], align=False)
+
+# --- FILE LAYOUT ---
+# MAGIC | batch | batch | ...   where each batch is BATCH header (events, bytes) + zlib(records)
+MAGIC = b"USWEVT01"
+BATCH = struct.Struct("<II")
+
+class EventLog:
+    """
+    Typed event stream for offline analysis. emit() only writes a record into the
+    current in-memory batch; full batches go to a background thread that compresses
+    and appends them to `path`. At most `max_pending` batches wait for the writer, so
+    memory stays bounded (emit blocks if the disk cannot keep up).
+    Attach with engine.event_log = EventLog(path) and close() when done.
+    """
+    def __init__(self, path, batch_size=8192, max_pending=8, level=1):
+        self.path = path
+        self.batch_size = batch_size
+        self.level = level
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+
+        self.tick = 0  # Stamped on every event; the engine sets it at the start of each update
+        self.batch = np.empty(batch_size, dtype=EVENT_DTYPE)
+        self.fill = 0
+        self.counts = np.zeros(len(EVENT_NAMES), dtype=np.int64)  # Flushed events per kind
+
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+        self.writer.start()
+
+    def emit(self, kind, agent, other=-1, node=-1, value=0):
+        self.batch[self.fill] = (self.tick, kind, agent, other, node, value)
+        self.fill += 1
+        if self.fill == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Hands the current batch to the writer (even if not full) and starts a new one."""
+        if not self.fill:
+            return
+        batch = self.batch[:self.fill]
+        self.counts += np.bincount(batch["kind"], minlength=len(EVENT_NAMES))[:len(EVENT_NAMES)]
+        self.pending.put(batch)
+        self.batch = np.empty(self.batch_size, dtype=EVENT_DTYPE)
+        self.fill = 0
+
+    def _write_loop(self):
+        while True:
+            batch = self.pending.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                continue  # Keep draining so emit() never blocks on a dead writer
+            try:
+                data = zlib.compress(batch.tobytes(), self.level)
+                self.file.write(BATCH.pack(len(batch), len(data)))
+                self.file.write(data)
+            except OSError as exc:
+                self.error = exc
+
+    def summary(self):
+        """Events flushed so far, per kind name."""
+        return dict(zip(EVENT_NAMES, self.counts.tolist()))
+
+    def close(self):
+        """Flushes the last batch, waits for the writer and closes the file."""
+        if self.file.closed:
+            return
+        self.flush()
+        self.pending.put(None)
+        self.writer.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_batches(path):
+    """Yields the events of a log file batch by batch (structured EVENT_DTYPE arrays)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        while True:
+            header = f.read(BATCH.size)
+            if len(header) < BATCH.size:
+                return
+            count, nbytes = BATCH.unpack(header)
+            yield np.frombuffer(zlib.decompress(f.read(nbytes)), dtype=EVENT_DTYPE, count=count)
+
+def read_events(path):
+    """Every event in a log file as one structured array (fields: tick, kind, agent, other, node, value)."""
+    batches = list(iter_batches(path))
+    return np.concatenate(batches) if batches else np.zeros(0, dtype=EVENT_DTYPE)
@@ -0,0 +1,141 @@
+# headless.py
+import argparse
+import time
+import config as c
+from logic_engine import SimulationEngine
+from event_engine import EventSimulationEngine
+from meso_engine import MesoSimulationEngine
+from event_log import EventLog
+from recorder import Recorder
+from profiler import Profiler
+from sharded_engine import ShardedEngine
+
+def run_headless(engine=None, dt=None, ticks=None, seconds=None):
+    """
+    Steps the engine with a fixed dt as fast as the CPU allows.
+    Stops after `ticks` steps or `seconds` of simulated time (whichever is given).
+    Returns the metric time series as a dict of lists.
+    """
+    if engine is None:
+        engine = SimulationEngine()
+    if dt is None:
+        dt = 1.0 / c.FPS
+    if ticks is None:
+        if seconds is None:
+            raise ValueError("run_headless needs either ticks or seconds")
+        ticks = int(round(seconds / dt))
+
+    series = {
+        "time": [],
+        "efficiency": [],
+        "entropy": [],
+        "waiting_passengers": [],
+        "deliveries": [],
+    }
+
+    sim_time = 0.0
+    for _ in range(ticks):
+        engine.update(dt)
+        sim_time += dt
+
+        series["time"].append(sim_time)
+        series["efficiency"].append(engine.system_efficiency)
+        series["entropy"].append(engine.system_entropy)
+        series["waiting_passengers"].append(engine.waiting_passengers)
+        series["deliveries"].append(engine.deliveries)
+
+    return series
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the simulation without a display.")
+    parser.add_argument("--ticks", type=int, default=None, help="Number of steps to simulate")
+    parser.add_argument("--seconds", type=float, default=None, help="Simulated seconds (used if --ticks is not given)")
+    parser.add_argument("--dt", type=float, default=1.0 / c.FPS, help="Fixed time step in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (same seed, same run)")
+    parser.add_argument("--city", default=None, metavar="PATH",
+                        help="Street network to simulate (.graphml or .geojson; compiled once, then cached)")
+    parser.add_argument("--dispatch", type=int, default=None, metavar="K",
+                        help="Use the central dispatcher every K ticks instead of greedy hunting")
+    parser.add_argument("--compare-dispatch", type=int, default=None, metavar="K",
+                        help="Run greedy and dispatch-every-K back to back and compare them")
+    parser.add_argument("--event", action="store_true",
+                        help="Use the discrete-event engine (dt only sets how often metrics are sampled)")
+    parser.add_argument("--meso", action="store_true",
+                        help="Use the mesoscopic link-queue engine (edge capacities, spillback)")
+    parser.add_argument("--shards", type=int, default=None, metavar="N",
+                        help="Split the city's zones over N worker processes (greedy mode only)")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="Write the run to a recording (play it back with replay.py)")
+    parser.add_argument("--events", default=None, metavar="PATH",
+                        help="Log sightings, tickets, pickups, dropoffs and path changes to a compact event file")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="Time every phase and dump the per-tick table (.csv, or .json for summary + columns)")
+    args = parser.parse_args()
+
+    if args.ticks is None and args.seconds is None:
+        args.ticks = 10000
+
+    if args.compare_dispatch:
+        modes = [("greedy", None), (f"dispatch/{args.compare_dispatch}", args.compare_dispatch)]
+    else:
+        modes = [("dispatch" if args.dispatch else "greedy", args.dispatch)]
+
+    engine_cls = EventSimulationEngine if args.event else MesoSimulationEngine if args.meso else SimulationEngine
+    for label, interval in modes:
+        if args.event:
+            label += " event"
+        elif args.meso:
+            label += " meso"
+        start = time.perf_counter()
+        if args.shards:
+            engine = ShardedEngine(workers=args.shards, dispatch_interval=interval, seed=args.seed,
+                                   city_file=args.city)
+            series = run_headless(engine, dt=args.dt, ticks=args.ticks, seconds=args.seconds)
+            engine.close()
+            print_summary(f"{label} shards={args.shards} seed={engine.seed}", series, time.perf_counter() - start)
+            continue
+        engine = engine_cls(dispatch_interval=interval, seed=args.seed, city_file=args.city)
+        if args.record:
+            path = args.record if len(modes) == 1 else f"{args.record}.{label.replace('/', '-').replace(' ', '-')}"
+            engine.recorder = Recorder(path, engine)
+        if args.events:
+            path = args.events if len(modes) == 1 else f"{args.events}.{label.replace('/', '-').replace(' ', '-')}"
+            engine.event_log = EventLog(path)
+        if args.profile:
+            engine.profiler = Profiler(capacity=max(args.ticks or 0, 4096))
+        series = run_headless(engine, dt=args.dt, ticks=args.ticks, seconds=args.seconds)
+        if engine.recorder is not None:
+            engine.recorder.close()
+        if engine.event_log is not None:
+            engine.event_log.close()
+            print(f"[{label}] events: " + "  ".join(f"{k}={v}" for k, v in engine.event_log.summary().items()))
+        if engine.profiler is not None:
+            path = args.profile if len(modes) == 1 else f"{args.profile}.{label.replace('/', '-').replace(' ', '-')}"
+            engine.profiler.dump(path)
+            print_profile(label, engine.profiler.summary())
+        elapsed = time.perf_counter() - start
+        print_summary(f"{label} seed={engine.seed}", series, elapsed)
+
+def print_summary(label, series, elapsed):
+    """One block of throughput / cost numbers for a finished run."""
+    n = len(series["time"])
+    if not n:
+        print(f"[{label}] no ticks simulated")
+        return
+    sim_seconds = series["time"][-1]
+    deliveries = series["deliveries"][-1]
+    print(f"[{label}] {n} ticks ({sim_seconds:.1f}s simulated) in {elapsed:.2f}s "
+          f"-> {n / elapsed if elapsed > 0 else float('inf'):.0f} ticks/s, {1000 * elapsed / n:.3f} ms CPU/tick")
+    print(f"[{label}] deliveries: {deliveries} ({deliveries * 3600 / sim_seconds:.1f}/hour)  "
+          f"final efficiency: {series['efficiency'][-1]:.1f}%  entropy: {series['entropy'][-1]:.2f}")
+
+def print_profile(label, summary):
+    """Per-phase milliseconds per tick from a Profiler summary."""
+    print(f"[{label}] profile over {summary['ticks']} ticks:")
+    for phase, ms in summary["phase_ms"].items():
+        print(f"    {phase:<18} {ms:8.3f} ms")
+    counters = "  ".join(f"{name}={value:.2f}" for name, value in summary["counters"].items())
+    print(f"    per tick: {counters}")
+
+if __name__ == "__main__":
+    main()
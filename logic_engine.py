@@ -1,107 +1,241 @@
 import random
-import statistics  # Added for variance calculation
+import numpy as np
 from city import CityGraph
+from city_loader import load_city
 from rickshaw import Rickshaw
 from police import PoliceUnit
-from passenger import Passenger
-import config as c
+from passenger import PassengerPool
+from agent_store import AgentStore, KIND_RICKSHAW
+from spatial_index import NodeGrid, PassengerIndex, VisionMap
+from dispatcher import Dispatcher
+from event_log import PICKUP, DROPOFF
+from run_config import RunConfig
+
+def make_rng_streams(seed):
+    """
+    One independent random.Random per subsystem, all derived from a single seed,
+    so e.g. changing how often police roll dice does not shift passenger spawns.
+    """
+    return {name: random.Random(f"{seed}:{name}") for name in ("spawn", "rickshaws", "police")}
 
 class SimulationEngine:
-    def __init__(self):
-        self.city = CityGraph(150) # Using new irregular city
-        self.rickshaws = [Rickshaw(i, self.city) for i in range(12)]
-        self.police = [PoliceUnit(991, self.city), PoliceUnit(992, self.city)]
-        self.passengers = []
-        
+    def __init__(self, run_config=None, city=None, **overrides):
+        """
+        run_config: a RunConfig with every setting for this run (defaults from config.py).
+        Keyword overrides change single fields, e.g. SimulationEngine(seed=5, n_police=8).
+        city: a prebuilt CityGraph to use instead of building one from the run config.
+        The same seed + same settings replays bit-identically.
+        """
+        cfg = run_config if run_config is not None else RunConfig()
+        if overrides:
+            cfg = cfg.with_overrides(**overrides)
+        if cfg.seed is None:
+            cfg = cfg.with_overrides(seed=random.SystemRandom().randrange(2**32))
+        self.cfg = cfg
+        self.seed = cfg.seed
+        self.rng = make_rng_streams(cfg.seed)
+
+        if city is None and cfg.city_file:
+            city = load_city(cfg.city_file, cfg.block_size)
+        elif city is None:
+            city = CityGraph(cfg.block_size, layout=cfg.city_layout) # Irregular city unless a layout is given
+        if cfg.bridge_capacity is not None:
+            city.set_bridge_capacity(cfg.bridge_capacity)
+        self.city = city
+
+        # Congestion-aware routing: shared cost snapshot, refreshed every K ticks
+        if cfg.routing not in ("static", "load"):
+            raise ValueError(f"Unknown routing mode '{cfg.routing}' (use 'static' or 'load')")
+        self.route_refresh = cfg.route_refresh_ticks if cfg.routing == "load" else 0
+        if cfg.routing == "load":
+            city.set_route_penalty(cfg.traffic_penalty)
+        elif city.route_penalty is not None:
+            city.set_route_penalty(None)
+
+        # One grid over the node coordinates, shared by passenger matching and police vision
+        self.grid = NodeGrid(self.city)
+        self.vision = VisionMap(self.city, self.grid, cfg.drone_vision_radius)
+
+        self.store = AgentStore(cfg.n_rickshaws + cfg.n_police)
+        self.rickshaws = [Rickshaw(i, self.city, self.store, self.rng["rickshaws"]) for i in range(cfg.n_rickshaws)]
+        self.police = [PoliceUnit(991 + k, self.city, self.store, self.rng["police"], cfg.ticket_chance, self.vision)
+                       for k in range(cfg.n_police)]
+        self.passengers = PassengerIndex(self.city, self.grid)
+        self.passenger_pool = PassengerPool()
+        self.next_passenger_id = 0
+        self.dispatcher = Dispatcher(self, cfg.dispatch_interval) if cfg.dispatch_interval else None
+        self.deliveries = 0
+        self.ticks = 0
+        self.recorder = None  # Optional recorder.Recorder, fed after every update
+        self.profiler = None  # Optional profiler.Profiler, timing every phase of update
+
         # Metrics State
         self.system_efficiency = 100.0
         self.system_entropy = 0.0
-        
+
         # Calculate bounds for renderer
-        all_lats = [d['pos'][1] for n, d in self.city.G.nodes(data=True)]
-        all_lons = [d['pos'][0] for n, d in self.city.G.nodes(data=True)]
-        self.bounds = (min(all_lats), max(all_lats), min(all_lons), max(all_lons))
+        all_lons = self.city.node_pos[:, 0]
+        all_lats = self.city.node_pos[:, 1]
+        self.bounds = (float(all_lats.min()), float(all_lats.max()), float(all_lons.min()), float(all_lons.max()))
+
+    @property
+    def event_log(self):
+        """Optional event_log.EventLog for typed agent events (kept on the store, which every agent reaches)."""
+        return self.store.event_log
+
+    @event_log.setter
+    def event_log(self, log):
+        self.store.event_log = log
+
+    @property
+    def waiting_passengers(self):
+        """How many passengers are waiting for a pickup right now."""
+        return len(self.passengers)
 
     def update(self, dt):
         """Advances the simulation by one step."""
-        
+        prof = self.profiler
+        if prof is not None: prof.start_tick(self)
+        if self.store.event_log is not None:
+            self.store.event_log.tick = self.ticks
+        # 0. New route cost snapshot (load-aware routing only)
+        if self.route_refresh and self.ticks and self.ticks % self.route_refresh == 0:
+            self.city.refresh_route_costs()
+        if prof is not None: prof.lap("route_refresh")
         # 1. Spawn Passengers
-        if random.random() < c.SPAWN_RATE:
-            nodes = list(self.city.G.nodes())
-            p1, p2 = random.sample(nodes, 2)
-            self.passengers.append(Passenger(p1, p2))
+        self.spawn_passengers()
+        if prof is not None: prof.lap("spawn")
+        # 2. Police Decisions
+        self.update_police()
+        if prof is not None: prof.lap("police_decide")
+        # 3. Rickshaw Decisions (dispatch or hunt, pickup, dropoff, pick a new trip)
+        self.update_rickshaws()
+        # 4. Move Everyone (one vectorized pass for rickshaws and police)
+        self.move_agents(dt)
+        if prof is not None: prof.lap("move")
+        # 5. Police Enforcement
+        self.enforce_law()
+        if prof is not None: prof.lap("enforce")
+        # 6. Update System Metrics
+        self.calculate_metrics()
+        if prof is not None:
+            prof.lap("metrics")
+            prof.end_tick(self)
+        self.ticks += 1
+        # 7. Record (optional)
+        if self.recorder is not None:
+            self.recorder.record(self, dt)
+
+    def spawn_passengers(self):
+        if self.rng["spawn"].random() < self.cfg.spawn_rate:
+            self.add_random_passenger()
 
-        # 2. Update Police
+    def add_random_passenger(self):
+        """A new passenger at a random node, heading to another random node."""
+        p1, p2 = self.rng["spawn"].sample(range(self.city.num_nodes), 2)
+        self.passengers.add(self.passenger_pool.acquire(p1, p2, self.next_passenger_id))
+        self.next_passenger_id += 1
+
+    def update_police(self):
         for cop in self.police:
-            cop.decide_move(self.rickshaws)
-            cop.move(dt)
-            cop.enforce_law()
+            cop.decide_move()
+
+    def update_rickshaws(self):
+        # Central Dispatch (optional, replaces greedy hunting)
+        if self.dispatcher:
+            self.dispatcher.step()
+        if self.profiler is not None: self.profiler.lap("rickshaw_dispatch")
 
-        # 3. Update Rickshaws
+        store = self.store
+        near = self.hunt_targets(np.flatnonzero(store.kind[:store.size] == KIND_RICKSHAW))
         for agent in self.rickshaws:
-            if not agent.passenger:
-                agent.hunt(self.passengers)
-            
-            # Pickup Logic
-            if agent.state == "HUNTING" and agent.current_node == agent.destination_node and not agent.target_node:
-                picked_up = None
-                for i, p in enumerate(self.passengers):
-                    if p.node == agent.current_node:
-                        picked_up = p
-                        break
-                
-                if picked_up:
-                    self.passengers.remove(picked_up)
-                    agent.passenger = picked_up
-                    agent.state = "DELIVERING"
-                    agent.destination_node = picked_up.dest
-                    agent._recalculate_path()
-                else:
-                    agent.state = "IDLE"
-                    agent.destination_node = None
-
-            # Dropoff Logic
-            if agent.state == "DELIVERING" and agent.current_node == agent.destination_node and not agent.target_node:
-                agent.passenger = None
+            self.serve_rickshaw(agent, near[agent.idx])
+
+    def hunt_targets(self, rows):
+        """
+        The greedy hunt's nearest-passenger queries for these rickshaw rows, answered in one
+        batch before the rickshaws decide: per store row, the node of the closest waiting
+        passenger for the empty ones, -1 for everyone else.
+        """
+        store = self.store
+        near = np.full(store.size, -1, dtype=np.int64)
+        if not self.dispatcher and self.passengers:
+            empty = rows[store.passenger[rows] < 0]
+            near[empty] = self.passengers.nearest_nodes(store.current_node[empty])
+        return near.tolist()
+
+    def serve_rickshaw(self, agent, near=-1):
+        """
+        One rickshaw's decisions: hunt, pickup, dropoff, then pick a new trip if idle.
+        near: its batched nearest-passenger node from hunt_targets(), if any.
+        """
+        prof = self.profiler
+        if not agent.passenger and not self.dispatcher:
+            agent.hunt(self.passengers, near)
+        if prof is not None: prof.lap("rickshaw_hunt")
+
+        # Pickup Logic
+        if agent.state == "HUNTING" and agent.current_node == agent.destination_node and agent.target_node is None:
+            if self.dispatcher:
+                picked_up = self.dispatcher.claim(agent)
+            else:
+                picked_up = self.passengers.pop_at(agent.current_node)
+
+            if picked_up:
+                if self.store.event_log is not None:
+                    self.store.event_log.emit(PICKUP, agent.id, picked_up.id, agent.current_node)
+                agent.passenger = picked_up
+                agent.state = "DELIVERING"
+                agent.destination_node = picked_up.dest
+                agent._recalculate_path()
+            else:
                 agent.state = "IDLE"
-                agent.money += 10
                 agent.destination_node = None
-            
-            agent.move(dt)
-            
-        # 4. Update System Metrics
-        self.calculate_metrics()
+        if prof is not None: prof.lap("rickshaw_pickup")
+
+        # Dropoff Logic
+        if agent.state == "DELIVERING" and agent.current_node == agent.destination_node and agent.target_node is None:
+            if self.store.event_log is not None:
+                self.store.event_log.emit(DROPOFF, agent.id, agent.passenger.id, agent.current_node, 10)
+            self.passenger_pool.release(agent.passenger)
+            agent.passenger = None
+            agent.state = "IDLE"
+            agent.money += 10
+            agent.destination_node = None
+            self.deliveries += 1
+        if prof is not None: prof.lap("rickshaw_dropoff")
+
+        agent.roam()
+        if prof is not None: prof.lap("rickshaw_roam")
+
+    def move_agents(self, dt):
+        # Police always move at max speed (sirens on)
+        cfg = self.cfg
+        arrived = self.store.advance(dt, self.city.edge_load, cfg.rickshaw_speed_base,
+                                     cfg.traffic_penalty, cfg.police_speed)
+        self.store.settle_arrivals(arrived, self.city)
+
+    def enforce_law(self):
+        for cop in self.police:
+            cop.enforce_law()
 
     def calculate_metrics(self):
         """Calculates Homeostatic Health (Efficiency) and Entropy (Disorder)."""
-        
+
+        # Both metrics come from running load statistics kept by CityGraph at every load
+        # change, so this costs O(1) instead of a pass over every agent and edge.
+
         # --- Metric A: System Efficiency (Speed vs Potential) ---
-        total_speed_ratio = 0
-        active_agents = 0
-        
-        for agent in self.rickshaws:
-            if agent.target_node:
-                # Replicate the speed formula from rickshaw.py to measure current efficiency
-                edge_data = self.city.G.get_edge_data(agent.current_node, agent.target_node)
-                load = edge_data.get('current_load', 0)
-                
-                # Speed = Base / (1 + Load * Penalty)
-                current_speed = c.RICKSHAW_SPEED_BASE / (1 + load * c.TRAFFIC_PENALTY)
-                ratio = current_speed / c.RICKSHAW_SPEED_BASE
-                
-                total_speed_ratio += ratio
-                active_agents += 1
-        
+        # Every moving rickshaw adds 1 to the load of its edge, so the load total is the
+        # number of moving rickshaws, and each one runs at 1 / (1 + Load * Penalty) of base speed.
+        active_agents = self.city.load_sum
+        total_speed_ratio = self.city.speed_ratio_sum(self.cfg.traffic_penalty)
+
         if active_agents > 0:
             self.system_efficiency = (total_speed_ratio / active_agents) * 100
         else:
             self.system_efficiency = 100.0 # Perfect efficiency if no one is moving
 
         # --- Metric B: System Entropy (Load Variance) ---
-        loads = []
-        for u, v, data in self.city.G.edges(data=True):
-            loads.append(data.get('current_load', 0))
-            
-        if loads:
-            # Variance measures how "clumped" the traffic is
-            self.system_entropy = statistics.variance(loads) if len(loads) > 1 else 0.0
\ No newline at end of file
+        # Variance measures how "clumped" the traffic is
+        self.system_entropy = self.city.load_variance()
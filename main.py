@@ -1,12 +1,22 @@
+import argparse
 import pygame
 import sys
 import config as c
 from logic_engine import SimulationEngine
+from meso_engine import MesoSimulationEngine
+from profiler import Profiler
 from visualizer import Visualizer
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the simulation with the pygame display.")
+    parser.add_argument("--profile", action="store_true", help="Time every phase and show the slowest in the HUD")
+    parser.add_argument("--meso", action="store_true", help="Mesoscopic link-queue traffic (edge capacities, spillback)")
+    args = parser.parse_args()
+
     # 1. Setup Logic
-    engine = SimulationEngine()
+    engine = MesoSimulationEngine() if args.meso else SimulationEngine()
+    if args.profile:
+        engine.profiler = Profiler()
     
     # 2. Setup Display
     vis = Visualizer(engine.bounds)
@@ -30,6 +40,8 @@ def main():
             "efficiency": engine.system_efficiency,
             "entropy": engine.system_entropy
         }
+        if engine.profiler is not None:
+            metrics["profile"] = engine.profiler.hud_lines()
         vis.draw(engine.city, engine.rickshaws, engine.police, engine.passengers, metrics)
         
     pygame.quit()
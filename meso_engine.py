@@ -0,0 +1,171 @@
+# meso_engine.py
+import numpy as np
+from agent_store import KIND_RICKSHAW, KIND_POLICE, IDLE
+from logic_engine import SimulationEngine
+
+def group_ranks(keys):
+    """For sorted keys: the position of every element within its run of equal keys."""
+    n = len(keys)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    first = np.repeat(starts, np.diff(np.r_[starts, n]))
+    return np.arange(n) - first
+
+class MesoSimulationEngine(SimulationEngine):
+    """
+    Mesoscopic alternative to the per-vehicle slowdown: every edge is a FIFO queue of
+    rickshaws that honors edge_capacity.
+      - A rickshaw may leave its edge once the free-flow time (1 / rickshaw_speed_base) has passed.
+      - An edge lets out at most capacity * meso_outflow vehicles per second (the budget
+        carries over between ticks, so slow edges release one vehicle every few ticks).
+      - A rickshaw only moves on if its next edge has room; otherwise it waits at the head of
+        its queue and everyone behind it waits too, so a full bridge backs traffic up
+        into the streets feeding it (spillback).
+    All of this runs as a few sorted/grouped NumPy passes per tick over the edges, not a
+    loop over vehicles. Positions are derived from the queues (the head of a queue stands at
+    the end of the edge, the others stacked behind it), so rendering and police work unchanged.
+
+    A head of queue that has been held back for `stuck_time` seconds moves on anyway (the
+    usual queue-model escape from circular gridlock), even if that overfills the next edge.
+
+    Police keep free driving at police_speed (they are not traffic). Rickshaws decide while
+    standing at a node and on every node they pass (the tick after reaching it, like
+    event_engine on each arrival), not while queued mid-edge; spawn_rate may exceed 1
+    (passengers per tick on average) for city-scale demand.
+    Trip starts are not held back: a rickshaw setting off onto a full edge still enters it.
+    """
+    def __init__(self, run_config=None, city=None, stuck_time=30.0, **overrides):
+        super().__init__(run_config, city, **overrides)
+        self.now = 0.0
+        self.free_time = 1.0 / self.cfg.rickshaw_speed_base
+        self.stuck_time = stuck_time
+        self.outflow = self.city.edge_capacity * self.cfg.meso_outflow   # Vehicles per second per edge
+        self.budget = np.zeros(self.city.num_edges)                      # Vehicles each edge may still let out
+        self.queued = 0  # Rickshaws that could leave their edge but were held back last tick
+        self.arrived = np.zeros(0, dtype=np.int64)  # Rickshaw rows that reached a node last tick
+
+        # Per-row queue state (indexed like the AgentStore rows)
+        self.entered_at = np.zeros(self.store.capacity)                # When the row entered its current edge
+        self.entry_seq = np.zeros(self.store.capacity, dtype=np.int64)  # FIFO order across all edges
+        self._seq = 0
+        self.store.path_listener = self._on_path_change
+
+    def _fit_rows(self):
+        """Grows the per-row arrays if agents were added after construction."""
+        n = self.store.capacity
+        if len(self.entered_at) < n:
+            self.entered_at = np.resize(self.entered_at, n)
+            self.entry_seq = np.resize(self.entry_seq, n)
+
+    def _on_path_change(self, i):
+        # A new path puts the agent at the back of its first edge's queue
+        self._fit_rows()
+        self.entered_at[i] = self.now
+        self.entry_seq[i] = self._seq
+        self._seq += 1
+
+    # --- Demand and Decisions ---
+
+    def spawn_passengers(self):
+        """floor(spawn_rate) passengers per tick, plus one more with the fractional chance."""
+        rate = self.cfg.spawn_rate
+        count = int(rate) + (self.rng["spawn"].random() < rate - int(rate))
+        for _ in range(count):
+            self.add_random_passenger()
+
+    def update_rickshaws(self):
+        # Central Dispatch (optional, replaces greedy hunting)
+        if self.dispatcher:
+            self.dispatcher.step()
+        if self.profiler is not None: self.profiler.lap("rickshaw_dispatch")
+
+        # Rickshaws standing at a node, and those that just passed one, decide (in row order)
+        store = self.store
+        n = store.size
+        standing = np.flatnonzero((store.kind[:n] == KIND_RICKSHAW) & (store.current_edge[:n] < 0))
+        # An idle rickshaw at the end of its roam is free to hunt from here, including the
+        # passengers waiting right at this node (hunt() skips targets equal to the old destination)
+        store.destination_node[standing[store.state[standing] == IDLE]] = -1
+        deciding = np.union1d(standing, self.arrived)
+        near = self.hunt_targets(deciding)
+        views = store.views
+        for i in deciding.tolist():
+            self.serve_rickshaw(views[i], near[i])
+
+    # --- Link Queues ---
+
+    def move_agents(self, dt):
+        self.now += dt
+        self._fit_rows()
+        store, city, cfg = self.store, self.city, self.cfg
+        n = store.size
+
+        # 1. Police: free driving, as in the tick engine
+        police = np.flatnonzero((store.kind[:n] == KIND_POLICE) & (store.current_edge[:n] >= 0))
+        progress = store.progress[police] + cfg.police_speed * dt
+        store.progress[police] = progress
+        store.settle_arrivals(police[progress >= 1.0], city)
+
+        # 2. Outflow budget (never more than one tick's worth, or one vehicle, saved up)
+        self.budget = np.minimum(self.budget + self.outflow * dt, np.maximum(self.outflow * dt, 1.0))
+
+        # 3. Rickshaws past their free-flow time, in queue order per edge (they are the queue heads)
+        moving = np.flatnonzero((store.kind[:n] == KIND_RICKSHAW) & (store.current_edge[:n] >= 0))
+        ready = moving[self.now - self.entered_at[moving] >= self.free_time - 1e-9]
+        edges = store.current_edge[ready]
+        order = np.lexsort((self.entry_seq[ready], edges))
+        ready, edges = ready[order], edges[order]
+        rank = group_ranks(edges)
+        go = rank < np.floor(self.budget[edges] + 1e-9)
+
+        # 4. Room downstream (free space at the start of the tick, oldest arrivals first)
+        pos = store.path_pos[ready] + 1
+        has_next = pos + 1 < store.path_len[ready]
+        next_edge = np.where(has_next, store.path_edges[store.path_start[ready] + pos], -1)
+        space = np.maximum(city.edge_capacity - city.edge_load, 0)
+        stuck = self.now - self.entered_at[ready] >= self.free_time + self.stuck_time
+        while True:
+            want = np.flatnonzero(go & has_next & ~stuck)
+            by_next = want[np.lexsort((self.entry_seq[ready[want]], next_edge[want]))]
+            nxt = next_edge[by_next]
+            blocked = by_next[group_ranks(nxt) >= space[nxt]]
+            if not len(blocked):
+                break
+            # FIFO: a blocked head holds back everyone behind it on the same edge
+            stop = np.zeros(len(ready), dtype=np.int64)
+            stop[blocked] = 1
+            held = np.cumsum(stop)
+            group_start = np.arange(len(ready)) - rank
+            held -= np.r_[0, held][group_start]
+            go &= held == 0
+
+        # 5. Move the released rickshaws onto their next edge (or their final node)
+        leaving = ready[go]
+        np.subtract.at(self.budget, edges[go], 1)
+        store.progress[leaving] = 1.0
+        store.settle_arrivals(leaving, city)
+        entered = leaving[store.current_edge[leaving] >= 0]
+        self.entered_at[entered] = self.now
+        self.entry_seq[entered] = self._seq + np.arange(len(entered))
+        self._seq += len(entered)
+        self.queued = int(len(ready) - len(leaving))
+        self.arrived = leaving
+
+        self.sync_positions()
+
+    def sync_positions(self):
+        """
+        Progress along the edge for every rickshaw on one: how far free flow would have
+        taken it, but never past its place in the queue (the k-th in line stands k
+        capacity-slots back from the end).
+        """
+        store = self.store
+        n = store.size
+        moving = np.flatnonzero((store.kind[:n] == KIND_RICKSHAW) & (store.current_edge[:n] >= 0))
+        edges = store.current_edge[moving]
+        order = np.lexsort((self.entry_seq[moving], edges))
+        moving, edges = moving[order], edges[order]
+        travel = (self.now - self.entered_at[moving]) / self.free_time
+        slot = 1.0 - group_ranks(edges) / np.maximum(self.city.edge_capacity[edges], 1)
+        store.progress[moving] = np.clip(np.minimum(travel, slot), 0.0, 1.0)
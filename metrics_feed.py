@@ -0,0 +1,135 @@
+# metrics_feed.py
+import collections
+import threading
+import time
+import numpy as np
+
+class MetricsFeed:
+    """
+    Bounded ring buffer of snapshots between a running simulation (producer) and a UI
+    (consumer). Each snapshot carries the metrics, every agent position, and only the
+    edge loads that changed since the previous snapshot. The producer never waits for
+    the consumer: when the buffer is full the oldest snapshot is dropped, and a consumer
+    that fell behind resyncs from full_state() instead of replaying deltas.
+    """
+    def __init__(self, maxlen=256):
+        self.snapshots = collections.deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.edge_load = None    # Loads as of the newest snapshot (for resyncs)
+        self.positions = None
+
+    def publish(self, tick, sim_time, city, store, metrics, waiting, deliveries):
+        """Called from the simulation thread; cost is O(agents + changed edges)."""
+        loads = city.edge_load
+        if self.edge_load is None:
+            changed = np.arange(len(loads))
+        else:
+            changed = np.flatnonzero(loads != self.edge_load)
+        positions = store.positions(city)
+        snapshot = {
+            "tick": tick,
+            "time": sim_time,
+            "efficiency": metrics["efficiency"],
+            "entropy": metrics["entropy"],
+            "waiting_passengers": waiting,
+            "deliveries": deliveries,
+            "changed_edges": changed,
+            "changed_loads": loads[changed].copy(),
+            "positions": positions,
+            "kind": store.kind[:store.size].copy(),
+            "carrying": store.passenger[:store.size] >= 0,
+        }
+        with self.lock:
+            self.seq += 1
+            snapshot["seq"] = self.seq
+            self.snapshots.append(snapshot)
+            self.edge_load = loads.copy()
+            self.positions = positions
+
+    def since(self, seq):
+        """
+        Snapshots newer than `seq` (oldest first) and whether any were dropped in between,
+        in which case the edge deltas are incomplete and full_state() must be used.
+        """
+        with self.lock:
+            new = [s for s in self.snapshots if s["seq"] > seq]
+        gap = bool(new) and new[0]["seq"] != seq + 1
+        return new, gap
+
+    def full_state(self):
+        """(seq, edge loads) as of the newest snapshot."""
+        with self.lock:
+            return self.seq, None if self.edge_load is None else self.edge_load.copy()
+
+class EngineRunner(threading.Thread):
+    """
+    Steps an engine with a fixed dt in a background thread and publishes a snapshot
+    every `publish_every` ticks. realtime=True sleeps so simulated time keeps pace
+    with the wall clock; otherwise it runs as fast as it can.
+    """
+    def __init__(self, engine, feed, dt, publish_every=10, realtime=False):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.feed = feed
+        self.dt = dt
+        self.publish_every = publish_every
+        self.realtime = realtime
+        self.stopped = threading.Event()
+        self.tick = 0
+        self.sim_time = 0.0
+
+    def run(self):
+        engine = self.engine
+        start = time.perf_counter()
+        while not self.stopped.is_set():
+            engine.update(self.dt)
+            self.tick += 1
+            self.sim_time += self.dt
+            if self.tick % self.publish_every == 0:
+                metrics = {"efficiency": engine.system_efficiency, "entropy": engine.system_entropy}
+                self.feed.publish(self.tick, self.sim_time, engine.city, engine.store, metrics,
+                                  len(engine.passengers), engine.deliveries)
+            if self.realtime:
+                ahead = self.sim_time - (time.perf_counter() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def stop(self):
+        self.stopped.set()
+
+class ReplayRunner(threading.Thread):
+    """Like EngineRunner, but walks a replay.ReplayPlayer through its recording in real time."""
+    def __init__(self, player, feed, publish_every=10, speed=1.0, loop=True):
+        super().__init__(daemon=True)
+        self.player = player
+        self.feed = feed
+        self.publish_every = publish_every
+        self.speed = speed
+        self.loop = loop
+        self.stopped = threading.Event()
+
+    def run(self):
+        player = self.player
+        times = player.times
+        num_ticks = len(times)
+        tick = 0
+        start = time.perf_counter()
+        while not self.stopped.is_set():
+            player.seek(tick)
+            self.feed.publish(tick, float(times[tick]), player.city, player.store, player.metrics,
+                              len(player.passengers), int(player.deliveries))
+
+            tick += self.publish_every
+            if tick >= num_ticks:
+                if not self.loop:
+                    return
+                tick = 0
+                start = time.perf_counter()
+            # Wait until the next published tick is due
+            due = (times[tick] - times[0]) / self.speed - (time.perf_counter() - start)
+            if due > 0:
+                time.sleep(due)
+
+    def stop(self):
+        self.stopped.set()
@@ -1,4 +1,28 @@
 class Passenger:
-    def __init__(self, node_id, destination_id):
+    __slots__ = ("id", "node", "dest")
+
+    def __init__(self, node_id, destination_id, passenger_id=-1):
+        self.id = passenger_id
         self.node = node_id
-        self.dest = destination_id
\ No newline at end of file
+        self.dest = destination_id
+
+class PassengerPool:
+    """
+    Recycles Passenger objects: delivered passengers are released back into the pool
+    and handed out again for new spawns instead of allocating a fresh object each time.
+    """
+    def __init__(self):
+        self.free = []
+
+    def acquire(self, node_id, destination_id, passenger_id=-1):
+        if not self.free:
+            return Passenger(node_id, destination_id, passenger_id)
+        pax = self.free.pop()
+        pax.id = passenger_id
+        pax.node = node_id
+        pax.dest = destination_id
+        return pax
+
+    def release(self, pax):
+        """Returns a passenger nobody refers to any more (e.g. just dropped off)."""
+        self.free.append(pax)
@@ -1,44 +1,61 @@
 # police.py
-import networkx as nx
 import random
 import config as c
+from agent_store import AgentStore, AgentView, KIND_POLICE, HUNTING, DELIVERING
+from event_log import SIGHTING, PURSUIT_START, TICKET
+from spatial_index import NodeGrid, VisionMap
 
-class PoliceUnit:
-    def __init__(self, agent_id, city_graph):
+class PoliceUnit(AgentView):
+    __slots__ = ("id", "city", "rng", "ticket_chance", "tickets_issued", "vision")
+
+    def __init__(self, agent_id, city_graph, store=None, rng=None, ticket_chance=0.05, vision=None):
+        """vision: a VisionMap shared by all units (built from config.DRONE_VISION_RADIUS if omitted)."""
+        super().__init__(store if store is not None else AgentStore(1), KIND_POLICE)
         self.id = agent_id
         self.city = city_graph
-        self.G = city_graph.G
-        
-        self.current_node = random.choice(list(self.G.nodes()))
-        self.target_node = None
-        self.destination_node = None
-        self.path = []
-        self.progress = 0.0
+        self.rng = rng if rng is not None else random.Random()  # Start node, patrols and ticket rolls
+        self.ticket_chance = ticket_chance
+        self.tickets_issued = 0
+        self.vision = vision if vision is not None else VisionMap(city_graph, NodeGrid(city_graph), c.DRONE_VISION_RADIUS)
         
+        self.current_node = self.rng.randrange(city_graph.num_nodes)
         self.state = "PATROL"  # PATROL, PURSUIT
-        self.target_agent = None
 
-    def decide_move(self, agents):
+    @property
+    def target_agent(self):
+        j = self.store.target_agent[self.idx]
+        return None if j < 0 else self.store.views[j]
+
+    @target_agent.setter
+    def target_agent(self, agent):
+        self.store.target_agent[self.idx] = -1 if agent is None else agent.idx
+
+    def decide_move(self):
         """
         Police AI: Patrol -> Speed Trap -> Pursue.
         Target agents who are 'Speeding' (moving efficiently on empty roads).
         """
         if self.state == "PATROL":
             # 1. Scan visible edges for speeders
-            violator = self._scan_for_speeders(agents)
+            violator = self._scan_for_speeders()
             
             if violator:
-                print(f"Police {self.id}: Spotted Speeder {violator.id}!")
+                log = self.store.event_log
+                if log is not None:
+                    log.emit(SIGHTING, self.id, violator.id, violator.current_node,
+                             self.city.edge_load[violator.current_edge])
                 self.target_agent = violator
                 self.state = "PURSUIT"
                 # Predict where they are going (intercept logic)
-                self.destination_node = violator.target_node if violator.target_node else violator.current_node
+                self.destination_node = violator.target_node if violator.target_node is not None else violator.current_node
+                if log is not None:
+                    log.emit(PURSUIT_START, self.id, violator.id, self.destination_node)
                 self._recalculate_path()
                 return
 
             # 2. Random Patrol if no target
-            if not self.target_node:
-                self.destination_node = random.choice(list(self.G.nodes()))
+            if self.target_node is None:
+                self.destination_node = self.rng.randrange(self.city.num_nodes)
                 self._recalculate_path()
 
         elif self.state == "PURSUIT":
@@ -54,65 +71,38 @@ class PoliceUnit:
                 self.destination_node = current_target_loc
                 self._recalculate_path()
 
-    def _scan_for_speeders(self, agents):
+    def _scan_for_speeders(self):
         """
-        Checks for agents on the same street or neighbors.
+        Checks for agents on the same street or neighbors (within vision radius).
+        Only the agents standing on visible nodes are looked at, via the store's node index.
         Violation Trigger: moving on a low-load street (Speeding).
         """
-        # Get edges connected to current node
-        visible_edges = list(self.G.edges(self.current_node))
+        store = self.store
+        loads = self.city.edge_load
         
-        for agent in agents:
-            # Is the agent active?
-            if agent.state in ["HUNTING", "DELIVERING"] and agent.target_node:
-                
-                # Check if agent is on a visible edge
-                is_visible = False
-                if agent.current_node == self.current_node: is_visible = True
-                for u, v in visible_edges:
-                    if agent.current_node == v: is_visible = True
-                
-                if is_visible:
+        for node in self.vision.visible_from(self.current_node):
+            for i in sorted(store.agents_at(node)):
+                # Is the agent active?
+                edge = store.current_edge[i]
+                if store.state[i] in (HUNTING, DELIVERING) and edge >= 0:
                     # CHECK SPEED (The new logic)
                     # Get load of the street the agent is on
-                    try:
-                        load = self.G[agent.current_node][agent.target_node]['current_load']
-                        # Speeding Logic: Low Load (0 or 1 cars) = High Speed = Risk of Ticket
-                        if load < 2: 
-                            # 5% chance to get busted per tick if speeding
-                            if random.random() < 0.05: 
-                                return agent
-                    except KeyError:
-                        pass # Edge case where agent just switched nodes
+                    # Speeding Logic: Low Load (0 or 1 cars) = High Speed = Risk of Ticket
+                    if loads[edge] < 2: 
+                        # 5% chance (by default) to get busted per tick if speeding
+                        if self.rng.random() < self.ticket_chance: 
+                            return store.views[i]
         return None
 
     def _recalculate_path(self):
+        # Police don't count as traffic, so no edge loads change here
         try:
-            if not self.destination_node: return
-            self.path = nx.shortest_path(self.G, self.current_node, self.destination_node, weight='weight')
-            if len(self.path) > 1:
-                self.target_node = self.path[1]
-                self.progress = 0.0
-            else:
-                self.target_node = None
+            if self.destination_node is None: return
+            path = self.city.shortest_path(self.current_node, self.destination_node)
+            self.store.set_path(self.idx, path, self.city)
+            self.store.path_recalculated(self.idx)
         except:
-            self.target_node = None
-
-    def move(self, dt):
-        if not self.target_node: return
-
-        # Police always move at max speed (sirens on)
-        speed = c.RICKSHAW_SPEED_BASE * 1.8
-        self.progress += speed * dt
-        
-        if self.progress >= 1.0:
-            self.current_node = self.target_node
-            self.progress = 0.0
-            if len(self.path) > 2:
-                self.path.pop(0)
-                self.target_node = self.path[1]
-            else:
-                self.target_node = None
+            self.store.set_path(self.idx, [], self.city)
 
     def enforce_law(self):
         """Capture logic: Must overlap physically."""
@@ -122,21 +112,17 @@ class PoliceUnit:
                 
                 # Proximity check
                 if abs(self.progress - self.target_agent.progress) < 0.15:
-                    print(f"Police {self.id}: Ticketed Agent {self.target_agent.id}!")
+                    self.tickets_issued += 1
                     
                     # Penalty: Lose money, but KEEP passenger (it's a speeding ticket, not an impound)
+                    money_before = self.target_agent.money
                     self.target_agent.money -= 20 
                     if self.target_agent.money < 0: self.target_agent.money = 0
+                    log = self.store.event_log
+                    if log is not None:
+                        log.emit(TICKET, self.id, self.target_agent.id, self.current_node,
+                                 money_before - self.target_agent.money)
                     
                     # Reset Police
                     self.state = "PATROL"
                     self.target_agent = None
-
-    def get_position(self):
-        # Interpolation for smooth rendering
-        if not self.target_node: return self.city.G.nodes[self.current_node]['pos']
-        start = self.city.G.nodes[self.current_node]['pos']
-        end = self.city.G.nodes[self.target_node]['pos']
-        lon = start[0] + (end[0] - start[0]) * self.progress
-        lat = start[1] + (end[1] - start[1]) * self.progress
-        return (lon, lat)
\ No newline at end of file
@@ -0,0 +1,108 @@
+# profiler.py
+import csv
+import json
+import time
+import numpy as np
+
+# Phases of one tick, in the order update() runs them. Rickshaw and police movement
+# share one vectorized kernel, so "move" covers both.
+PHASES = ("route_refresh", "spawn", "police_decide", "rickshaw_dispatch", "rickshaw_hunt", "rickshaw_pickup",
+          "rickshaw_dropoff", "rickshaw_roam", "move", "enforce", "metrics")
+
+# Per-tick counters
+COUNTERS = ("shortest_path_calls", "path_recalculations", "tickets", "waiting_passengers")
+
+class Profiler:
+    """
+    Opt-in per-tick instrumentation: set engine.profiler = Profiler() to turn it on.
+    The engine marks phase boundaries with lap(); time since the previous lap is added
+    to that phase, so the phases of a tick add up to the whole tick. The newest
+    `capacity` ticks are kept in NumPy ring buffers.
+    """
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.phase_index = {name: k for k, name in enumerate(PHASES)}
+        self.times = np.zeros((capacity, len(PHASES)))
+        self.counts = np.zeros((capacity, len(COUNTERS)), dtype=np.int64)
+        self.tick_ids = np.zeros(capacity, dtype=np.int64)
+        self.ticks = 0          # Ticks recorded so far (also the next tick id)
+
+        self.current = np.zeros(len(PHASES))
+        self.mark = 0.0
+        self.last_totals = None  # Running engine counters at the end of the previous tick
+
+    # --- Hooks (called by the engine) ---
+
+    def start_tick(self, engine):
+        if self.last_totals is None:
+            self.last_totals = self._totals(engine)
+        self.current[:] = 0.0
+        self.mark = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[self.phase_index[phase]] += now - self.mark
+        self.mark = now
+
+    def end_tick(self, engine):
+        row = self.ticks % self.capacity
+        self.times[row] = self.current
+        totals = self._totals(engine)
+        self.counts[row, :3] = [now - before for now, before in zip(totals, self.last_totals)]
+        self.counts[row, 3] = len(engine.passengers)
+        self.last_totals = totals
+        self.tick_ids[row] = self.ticks
+        self.ticks += 1
+
+    @staticmethod
+    def _totals(engine):
+        return (engine.city.route_queries, engine.store.path_changes,
+                sum(cop.tickets_issued for cop in engine.police))
+
+    # --- Reading ---
+
+    def rows(self):
+        """(tick ids, phase seconds, counters) for the buffered ticks, oldest first."""
+        n = min(self.ticks, self.capacity)
+        order = (np.arange(n) + self.ticks - n) % self.capacity
+        return self.tick_ids[order], self.times[order], self.counts[order]
+
+    def summary(self):
+        """Mean milliseconds per phase and mean counters per tick over the buffered ticks."""
+        ids, times, counts = self.rows()
+        if not len(ids):
+            return {"ticks": 0, "phase_ms": dict.fromkeys(PHASES, 0.0), "counters": dict.fromkeys(COUNTERS, 0.0)}
+        phase_ms = times.mean(axis=0) * 1000
+        return {
+            "ticks": len(ids),
+            "tick_ms": float(times.sum(axis=1).mean() * 1000),
+            "phase_ms": dict(zip(PHASES, phase_ms.tolist())),
+            "counters": dict(zip(COUNTERS, counts.mean(axis=0).tolist())),
+        }
+
+    def hud_lines(self, last=60):
+        """A few short lines for the HUD: the slowest phases over the last `last` ticks."""
+        ids, times, counts = self.rows()
+        if not len(ids):
+            return []
+        phase_ms = times[-last:].mean(axis=0) * 1000
+        lines = [f"TICK: {phase_ms.sum():.2f} ms  SP/tick: {counts[-last:, 0].mean():.1f}"]
+        for k in np.argsort(phase_ms)[::-1][:3].tolist():
+            lines.append(f"  {PHASES[k]:<18} {phase_ms[k]:.2f} ms")
+        return lines
+
+    def dump(self, path):
+        """Writes the buffered ticks to CSV (one row per tick) or, for *.json, as the summary plus columns."""
+        ids, times, counts = self.rows()
+        if path.endswith(".json"):
+            report = dict(self.summary(), tick=ids.tolist(),
+                          **{f"{name}_s": times[:, k].tolist() for k, name in enumerate(PHASES)},
+                          **{name: counts[:, k].tolist() for k, name in enumerate(COUNTERS)})
+            with open(path, "w") as f:
+                json.dump(report, f)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("tick",) + tuple(f"{name}_s" for name in PHASES) + COUNTERS)
+            for tick, t, n in zip(ids.tolist(), times.tolist(), counts.tolist()):
+                writer.writerow([tick] + t + n)
@@ -0,0 +1,229 @@
+# recorder.py
+import json
+import mmap
+import struct
+import zlib
+import numpy as np
+
+# --- FILE LAYOUT ---
+# MAGIC | static arrays (raw) | chunk 0 columns | chunk 1 columns | ... | footer JSON | trailer
+# The footer indexes every block by offset; the trailer (footer offset + MAGIC) is the last 16 bytes.
+MAGIC = b"USWREC01"
+TRAILER = struct.Struct("<Q8s")
+
+# Per-agent columns taken from the AgentStore every tick: (name, dtype, encoding)
+AGENT_COLUMNS = (
+    ("current_node", np.int32, "delta"),
+    ("target_node", np.int32, "delta"),
+    ("current_edge", np.int32, "delta"),
+    ("progress", np.float64, "xor"),
+    ("state", np.int8, "delta"),
+    ("money", np.int64, "delta"),
+    ("passenger", np.int32, "delta"),
+)
+
+# One value per tick
+SCALAR_COLUMNS = (
+    ("time", np.float64, "raw"),
+    ("efficiency", np.float64, "raw"),
+    ("entropy", np.float64, "raw"),
+    ("deliveries", np.int64, "delta"),
+)
+
+def encode(block, encoding, level):
+    """
+    Compresses a (ticks, n) block. 'delta' stores each row as the difference to the
+    row before (integers), 'xor' does the same on the bit pattern (floats, lossless).
+    The first row of every chunk is stored as-is so chunks decode on their own.
+    """
+    if encoding == "delta":
+        block = block.copy()
+        block[1:] -= block[:-1].copy()
+    elif encoding == "xor":
+        bits = block.view(np.uint64).copy()
+        bits[1:] ^= block.view(np.uint64)[:-1]
+        block = bits
+    return zlib.compress(np.ascontiguousarray(block).tobytes(), level)
+
+def decode(buf, encoding, dtype, shape):
+    raw = zlib.decompress(buf)
+    if encoding == "xor":
+        bits = np.frombuffer(raw, dtype=np.uint64).reshape(shape).copy()
+        np.bitwise_xor.accumulate(bits, axis=0, out=bits)
+        return bits.view(dtype)
+    block = np.frombuffer(raw, dtype=dtype).reshape(shape).copy()
+    if encoding == "delta":
+        np.cumsum(block, axis=0, dtype=dtype, out=block)
+    return block
+
+class Recorder:
+    """
+    Writes a run to a compact binary file: per-agent columns, edge loads, waiting
+    passengers and the metrics, buffered for `chunk_ticks` ticks and then written as
+    one compressed block per column. Attach with engine.recorder = Recorder(path, engine)
+    (the engine calls record() at the end of every update) and close() when done.
+    """
+    def __init__(self, path, engine, chunk_ticks=256, level=6):
+        self.path = path
+        self.chunk_ticks = chunk_ticks
+        self.level = level
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+
+        self.sim_time = 0.0
+        self.num_ticks = 0
+        self.chunks = []
+        self._clear_buffers()
+
+        # The city and the agents' kinds never change, so they are written once, uncompressed
+        city = engine.city
+        n = engine.store.size
+        self.num_agents = n
+        self.static = {}
+        for name, array in (("node_pos", city.node_pos), ("edge_src", city.edge_src),
+                            ("edge_dst", city.edge_dst), ("edge_is_bridge", city.edge_is_bridge),
+                            ("kind", engine.store.kind[:n])):
+            self.static[name] = self._write_block(np.ascontiguousarray(array).tobytes(), array.dtype, array.shape)
+        self.meta = {
+            "num_agents": n,
+            "num_nodes": city.num_nodes,
+            "num_edges": city.num_edges,
+            "node_ids": [str(n) for n in city.node_ids],
+            "node_type": list(city.node_type),
+            "bounds": list(engine.bounds),
+            "config": engine.cfg.to_dict(),
+            "chunk_ticks": chunk_ticks,
+        }
+
+    def _clear_buffers(self):
+        self.rows = {name: [] for name, _, _ in AGENT_COLUMNS + SCALAR_COLUMNS}
+        self.rows["edge_load"] = []
+        self.pax_nodes = []
+
+    def record(self, engine, dt):
+        """Appends the engine's current state as one tick."""
+        store = engine.store
+        n = self.num_agents
+        self.sim_time += dt
+        for name, _, _ in AGENT_COLUMNS:
+            self.rows[name].append(getattr(store, name)[:n].copy())
+        self.rows["edge_load"].append(engine.city.edge_load.copy())
+        self.rows["time"].append(self.sim_time)
+        self.rows["efficiency"].append(engine.system_efficiency)
+        self.rows["entropy"].append(engine.system_entropy)
+        self.rows["deliveries"].append(engine.deliveries)
+        self.pax_nodes.append(np.fromiter((p.node for p in engine.passengers), dtype=np.int32))
+
+        self.num_ticks += 1
+        if len(self.rows["time"]) == self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered ticks as one chunk."""
+        ticks = len(self.rows["time"])
+        if not ticks:
+            return
+        columns = {}
+        for name, dtype, encoding in AGENT_COLUMNS + SCALAR_COLUMNS + (("edge_load", np.int32, "delta"),):
+            block = np.asarray(self.rows[name], dtype=dtype)
+            columns[name] = self._write_block(encode(block, encoding, self.level), block.dtype, block.shape, encoding)
+
+        # Waiting passengers are ragged: a count per tick plus all their nodes back to back
+        counts = np.array([len(nodes) for nodes in self.pax_nodes], dtype=np.int32)
+        nodes = np.concatenate(self.pax_nodes)
+        columns["pax_count"] = self._write_block(encode(counts, "raw", self.level), counts.dtype, counts.shape, "raw")
+        columns["pax_node"] = self._write_block(encode(nodes, "raw", self.level), nodes.dtype, nodes.shape, "raw")
+
+        self.chunks.append({"tick": self.num_ticks - ticks, "ticks": ticks, "columns": columns})
+        self._clear_buffers()
+
+    def _write_block(self, data, dtype, shape, encoding="raw"):
+        offset = self.file.tell()
+        self.file.write(data)
+        return [offset, len(data), np.dtype(dtype).str, list(shape), encoding]
+
+    def close(self):
+        """Flushes the last partial chunk and writes the footer index."""
+        if self.file.closed:
+            return
+        self.flush()
+        footer = json.dumps({"meta": dict(self.meta, num_ticks=self.num_ticks),
+                             "static": self.static, "chunks": self.chunks}).encode()
+        offset = self.file.tell()
+        self.file.write(footer)
+        self.file.write(TRAILER.pack(offset, MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Recording:
+    """
+    Memory-mapped reader for Recorder files. Only the footer is parsed up front;
+    chunks are decompressed on demand, so a long run can be streamed column by column
+    (iter_column) or jumped around in (frame) without reading the whole file.
+    """
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buf[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a recording")
+        offset, magic = TRAILER.unpack(self.buf[-TRAILER.size:])
+        if magic != MAGIC:
+            raise ValueError(f"{path} has no footer (recorder not closed?)")
+        index = json.loads(self.buf[offset:len(self.buf) - TRAILER.size])
+
+        self.meta = index["meta"]
+        self.static_index = index["static"]
+        self.chunks = index["chunks"]
+        self.num_ticks = self.meta["num_ticks"]
+        self.chunk_starts = np.array([ch["tick"] for ch in self.chunks], dtype=np.int64)
+        self._cached = (None, None)  # (chunk number, {column: block})
+
+    def static(self, name):
+        """A static array (node_pos, edge_src, ...) as a zero-copy view into the file (valid until close)."""
+        offset, nbytes, dtype, shape, _ = self.static_index[name]
+        return np.frombuffer(self.buf, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+
+    def column(self, name, chunk):
+        """One decoded column of one chunk: (ticks, n) for agents/edges, (ticks,) for scalars."""
+        offset, nbytes, dtype, shape, encoding = self.chunks[chunk]["columns"][name]
+        return decode(self.buf[offset:offset + nbytes], encoding, np.dtype(dtype), shape)
+
+    def iter_column(self, name):
+        """Yields a column chunk by chunk (bounded memory for analysis passes)."""
+        for k in range(len(self.chunks)):
+            yield self.column(name, k)
+
+    def scalar_series(self, name):
+        """A whole per-tick column (time, efficiency, ...) as one array."""
+        return np.concatenate(list(self.iter_column(name))) if self.chunks else np.zeros(0)
+
+    def frame(self, tick):
+        """Everything recorded at one tick, as a dict of arrays (plus 'pax_nodes')."""
+        if not 0 <= tick < self.num_ticks:
+            raise IndexError(f"tick {tick} outside recording of {self.num_ticks} ticks")
+        k = int(np.searchsorted(self.chunk_starts, tick, side="right")) - 1
+        if self._cached[0] != k:
+            self._cached = (k, {name: self.column(name, k) for name in self.chunks[k]["columns"]})
+        blocks = self._cached[1]
+        row = tick - self.chunks[k]["tick"]
+
+        frame = {name: block[row] for name, block in blocks.items() if name not in ("pax_count", "pax_node")}
+        counts = blocks["pax_count"]
+        start = int(counts[:row].sum())
+        frame["pax_nodes"] = blocks["pax_node"][start:start + counts[row]]
+        return frame
+
+    def close(self):
+        self.buf.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
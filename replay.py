@@ -0,0 +1,122 @@
+# replay.py
+import argparse
+import sys
+import numpy as np
+import config as c
+from agent_store import AgentStore, AgentView
+from passenger import Passenger
+from recorder import Recording
+
+class ReplayCity:
+    """The parts of a CityGraph the Visualizer reads, rebuilt from a recording."""
+    def __init__(self, recording):
+        meta = recording.meta
+        self.num_nodes = meta["num_nodes"]
+        self.num_edges = meta["num_edges"]
+        self.node_ids = meta["node_ids"]
+        self.node_type = meta["node_type"]
+        self.node_pos = recording.static("node_pos")
+        self.edge_src = recording.static("edge_src")
+        self.edge_dst = recording.static("edge_dst")
+        self.edge_is_bridge = recording.static("edge_is_bridge")
+        self.edge_load = np.zeros(self.num_edges, dtype=np.int32)
+
+class ReplayAgent(AgentView):
+    """A recorded agent: a view onto one row of the player's AgentStore."""
+    __slots__ = ("city",)
+
+    def __init__(self, store, kind, city):
+        super().__init__(store, kind)
+        self.city = city
+
+class ReplayPlayer:
+    """
+    Feeds recorded ticks to the Visualizer. seek(tick) jumps anywhere in the file;
+    only the chunk holding that tick gets decompressed.
+    """
+    def __init__(self, recording):
+        self.recording = recording
+        self.city = ReplayCity(recording)
+        self.bounds = tuple(recording.meta["bounds"])
+        self.times = recording.scalar_series("time")
+
+        kinds = recording.static("kind")
+        self.store = AgentStore(len(kinds))
+        agents = [ReplayAgent(self.store, int(kind), self.city) for kind in kinds.tolist()]
+        self.rickshaws = [a for a, kind in zip(agents, kinds.tolist()) if kind == 0]
+        self.police = [a for a, kind in zip(agents, kinds.tolist()) if kind != 0]
+        self.passengers = []
+        self.metrics = {"efficiency": 100.0, "entropy": 0.0}
+        self.deliveries = 0
+        self.tick = -1
+
+    def seek(self, tick):
+        """Loads the state recorded at `tick` into the city, store and passenger list."""
+        tick = min(max(tick, 0), self.recording.num_ticks - 1)
+        frame = self.recording.frame(tick)
+        n = self.store.size
+        for name in ("current_node", "target_node", "current_edge", "progress", "state", "money", "passenger"):
+            getattr(self.store, name)[:n] = frame[name]
+        self.city.edge_load[:] = frame["edge_load"]
+        self.passengers = [Passenger(int(node), -1) for node in frame["pax_nodes"].tolist()]
+        self.metrics = {"efficiency": float(frame["efficiency"]), "entropy": float(frame["entropy"])}
+        self.deliveries = int(frame["deliveries"])
+        self.tick = tick
+
+    def tick_at(self, sim_time):
+        """The last tick recorded at or before sim_time."""
+        return int(np.searchsorted(self.times, sim_time, side="right")) - 1
+
+def main():
+    # Display code is only needed here, so ReplayPlayer stays usable without pygame (dashboard.py)
+    import pygame
+    from visualizer import Visualizer
+
+    parser = argparse.ArgumentParser(description="Play back a recorded run.")
+    parser.add_argument("path", help="Recording written by recorder.Recorder (e.g. headless.py --record)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier")
+    args = parser.parse_args()
+
+    recording = Recording(args.path)
+    if not recording.num_ticks:
+        sys.exit(f"{args.path} holds no ticks")
+    player = ReplayPlayer(recording)
+    vis = Visualizer(player.bounds)
+    clock = pygame.time.Clock()
+
+    # Controls: SPACE pause, LEFT/RIGHT seek 10s, UP/DOWN speed, HOME restart
+    speed = args.speed
+    paused = False
+    sim_time = float(player.times[0])
+    end_time = float(player.times[-1])
+
+    running = True
+    while running:
+        dt = clock.tick(c.FPS) / 1000.0
+
+        # Input
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE: paused = not paused
+                elif event.key == pygame.K_RIGHT: sim_time += 10
+                elif event.key == pygame.K_LEFT: sim_time -= 10
+                elif event.key == pygame.K_UP: speed *= 2
+                elif event.key == pygame.K_DOWN: speed /= 2
+                elif event.key == pygame.K_HOME: sim_time = float(player.times[0])
+
+        if not paused:
+            sim_time += dt * speed
+        sim_time = min(max(sim_time, float(player.times[0])), end_time)
+
+        tick = player.tick_at(sim_time)
+        if tick != player.tick:
+            player.seek(tick)
+
+        vis.draw(player.city, player.rickshaws, player.police, player.passengers, player.metrics)
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
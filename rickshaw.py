@@ -1,36 +1,43 @@
 import networkx as nx
 import random
-import config as c
+from agent_store import AgentStore, AgentView, KIND_RICKSHAW
 
-class Rickshaw:
-    def __init__(self, agent_id, city_graph):
+class Rickshaw(AgentView):
+    """
+    A rickshaw agent. Its state lives in a row of the shared AgentStore;
+    movement is advanced in bulk by the engine (AgentStore.advance).
+    """
+    __slots__ = ("id", "city", "rng")
+
+    def __init__(self, agent_id, city_graph, store=None, rng=None):
+        super().__init__(store if store is not None else AgentStore(1), KIND_RICKSHAW)
         self.id = agent_id
         self.city = city_graph
-        self.G = city_graph.G
-        self.current_node = random.choice(list(self.G.nodes()))
-        self.target_node = None
-        self.destination_node = None
-        self.path = []
-        self.progress = 0.0
-        self.passenger = None
-        self.money = 0
+        self.rng = rng if rng is not None else random.Random()  # Start node and random trips
+        self.current_node = self.rng.randrange(city_graph.num_nodes)
         self.state = "IDLE"
 
-    def hunt(self, all_passengers):
-        if self.passenger or not all_passengers: return
-        
-        # Greedy search for nearest passenger
-        best_pax = None
-        min_dist = float('inf')
-        my_pos = self.city.G.nodes[self.current_node]['pos']
-        
-        for pax in all_passengers:
-            pax_pos = self.city.G.nodes[pax.node]['pos']
-            dist = (my_pos[0]-pax_pos[0])**2 + (my_pos[1]-pax_pos[1])**2
-            if dist < min_dist:
-                min_dist = dist
-                best_pax = pax
-        
+    @property
+    def passenger(self):
+        return self.store.riders[self.idx]
+
+    @passenger.setter
+    def passenger(self, pax):
+        self.store.riders[self.idx] = pax
+        self.store.passenger[self.idx] = -1 if pax is None else pax.id
+
+    def hunt(self, passengers, near=-1):
+        """
+        Greedy search for the nearest waiting passenger (passengers is a PassengerIndex).
+        near: the answer's node if the engine already batched the query (PassengerIndex.nearest_nodes).
+        """
+        if self.passenger or not passengers: return
+
+        # A batched answer stays right unless its node has been emptied since
+        best_pax = passengers.first_at(near) if near >= 0 else None
+        if best_pax is None:
+            best_pax = passengers.nearest(self.current_node)
+
         if best_pax:
             # FIX: Only recalculate if the destination is NEW
             if self.destination_node != best_pax.node:
@@ -39,77 +46,35 @@ class Rickshaw:
                 self._recalculate_path()
 
     def _recalculate_path(self):
+        store, i = self.store, self.idx
         try:
             # Clean up load on the old edge if we are switching mid-journey
-            if self.target_node and self.current_node != self.target_node:
-                if self.G.has_edge(self.current_node, self.target_node):
-                    self.G[self.current_node][self.target_node]['current_load'] -= 1
-                    if self.G[self.current_node][self.target_node]['current_load'] < 0:
-                        self.G[self.current_node][self.target_node]['current_load'] = 0
-            
-            if not self.destination_node:
-                self.destination_node = random.choice(list(self.G.nodes()))
-            
+            if store.current_edge[i] >= 0:
+                self.city.add_load(store.current_edge[i], -1)
+                store.current_edge[i] = -1
+                store.target_node[i] = -1
+
+            if store.destination_node[i] < 0:
+                store.destination_node[i] = self.rng.randrange(self.city.num_nodes)
+
             # Calculate new path
-            self.path = nx.shortest_path(self.G, self.current_node, self.destination_node, weight='weight')
-            
-            if len(self.path) > 1:
-                self.target_node = self.path[1]
-                self.progress = 0.0
-                # Add load to the new edge we are taking
-                self.G[self.current_node][self.target_node]['current_load'] += 1
-            else:
-                self.target_node = None
-        except (nx.NetworkXNoPath, KeyError):
+            path = self.city.shortest_path(int(store.current_node[i]), int(store.destination_node[i]))
+            store.set_path(i, path, self.city)
+            store.path_recalculated(i)
+
+            # Add load to the new edge we are taking
+            if store.current_edge[i] >= 0:
+                self.city.add_load(store.current_edge[i], 1)
+        except (nx.NetworkXNoPath, KeyError, IndexError):
             # Fallback if pathfinding fails
-            self.target_node = None
+            store.set_path(i, [], self.city)
 
-    def move(self, dt):
-        if not self.target_node:
-            # If idle or finished job, pick random
-            if not self.destination_node or self.current_node == self.destination_node:
-                 self.destination_node = random.choice(list(self.G.nodes()))
+    def roam(self):
+        """
+        If idle or finished job, pick a random destination. Runs in the decision phase, so the
+        agent already sets off along the new path in this tick's move.
+        """
+        if self.target_node is None:
+            if self.destination_node is None or self.current_node == self.destination_node:
+                 self.destination_node = self.rng.randrange(self.city.num_nodes)
                  self._recalculate_path()
-            return
-
-        # Safety check for graph changes
-        if not self.G.has_edge(self.current_node, self.target_node):
-            self.target_node = None
-            return
-        
-        # 1. Calculate Speed based on Traffic
-        edge_data = self.G.get_edge_data(self.current_node, self.target_node)
-        load = edge_data.get('current_load', 0)
-        
-        # Formula: Higher load = Lower speed
-        current_speed = c.RICKSHAW_SPEED_BASE / (1 + load * c.TRAFFIC_PENALTY)
-        
-        # 2. Move
-        self.progress += current_speed * dt
-        
-        # 3. Reach Next Node
-        if self.progress >= 1.0:
-            # Remove load from the edge we just finished
-            if self.target_node:
-                self.G[self.current_node][self.target_node]['current_load'] -= 1
-            
-            # Update Position
-            self.current_node = self.target_node
-            self.progress = 0.0
-            
-            # Pick next step in path
-            if len(self.path) > 2:
-                self.path.pop(0)
-                self.target_node = self.path[1]
-                # Add load to the next edge
-                self.G[self.current_node][self.target_node]['current_load'] += 1
-            else:
-                self.target_node = None
-
-    def get_position(self):
-        if not self.target_node: return self.G.nodes[self.current_node]['pos']
-        start = self.G.nodes[self.current_node]['pos']
-        end = self.G.nodes[self.target_node]['pos']
-        lon = start[0] + (end[0] - start[0]) * self.progress
-        lat = start[1] + (end[1] - start[1]) * self.progress
-        return (lon, lat)
\ No newline at end of file
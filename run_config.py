@@ -0,0 +1,48 @@
+# run_config.py
+from dataclasses import dataclass, asdict, fields, replace
+import config as c
+
+@dataclass
+class RunConfig:
+    """
+    Every setting a single simulation run depends on. Defaults come from config.py,
+    but each engine gets its own copy, so runs with different settings can share a process.
+    """
+    seed: int = None                  # None = pick one (the engine records it)
+
+    # --- Fleet ---
+    n_rickshaws: int = 12
+    n_police: int = 2
+    dispatch_interval: int = None     # None = greedy swarm, K = central dispatch every K ticks
+    routing: str = "static"           # "static" = route on street weights, "load" = congestion-aware
+    route_refresh_ticks: int = 30     # With load routing: ticks between route cost snapshots
+
+    # --- Mechanics ---
+    spawn_rate: float = c.SPAWN_RATE
+    rickshaw_speed_base: float = c.RICKSHAW_SPEED_BASE
+    traffic_penalty: float = c.TRAFFIC_PENALTY
+    police_speed_factor: float = 1.8  # Police drive at this multiple of the base speed
+    ticket_chance: float = 0.05       # Per-tick chance a visible speeder gets flagged
+    drone_vision_radius: float = c.DRONE_VISION_RADIUS  # Meters around the drone's node
+    meso_outflow: float = c.MESO_OUTFLOW  # Meso engine: edge outflow, vehicles/s per unit of capacity
+
+    # --- City ---
+    block_size: float = 150
+    city_layout: dict = None          # None = irregular city, else build_generated_city kwargs
+    city_file: str = None             # A .graphml/.geojson street network (city_loader); overrides city_layout
+    bridge_capacity: int = None       # None = keep what the city builder chose
+
+    @property
+    def police_speed(self):
+        return self.rickshaw_speed_base * self.police_speed_factor
+
+    def with_overrides(self, **overrides):
+        """A copy with some fields changed (unknown names raise TypeError)."""
+        return replace(self, **overrides)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def field_names(cls):
+        return [f.name for f in fields(cls)]
@@ -0,0 +1,218 @@
+# sharded_engine.py
+import multiprocessing
+import random
+import numpy as np
+from agent_store import KIND_RICKSHAW
+from logic_engine import SimulationEngine, make_rng_streams
+from police import PoliceUnit
+from rickshaw import Rickshaw
+from run_config import RunConfig
+
+def zone_shards(num_zones, num_shards):
+    """Shard number per zone: contiguous blocks of zones, so neighbours tend to share a worker."""
+    return np.arange(num_zones) * num_shards // max(num_zones, 1)
+
+class ShardEngine(SimulationEngine):
+    """
+    The part of the simulation one worker owns: the agents standing in its zones and
+    the loads of the edges leaving its nodes. Every worker builds the full city (routing
+    still spans the whole map), but only its own agents move and only its own nodes spawn
+    passengers. Agents that end a tick on another shard's node are exported.
+    """
+    def __init__(self, run_config, shard, num_shards):
+        if run_config.dispatch_interval:
+            raise ValueError("Central dispatch needs every passenger in one process; use greedy mode when sharding")
+        super().__init__(run_config)
+        self.shard = shard
+        self.num_shards = num_shards
+        self.node_shard = zone_shards(self.city.num_zones, num_shards)[self.city.node_zone]
+        self.own_nodes = np.flatnonzero(self.node_shard == shard)
+
+        # Every worker created the same agents; keep the ones starting on our nodes
+        foreign = np.flatnonzero(self.node_shard[self.store.current_node[:self.store.size]] != shard)
+        self.store.remove_rows(foreign.tolist())
+        self._refresh_agent_lists()
+
+        # Own random streams per shard, and our share of the city-wide spawn rate
+        self.rng = make_rng_streams(f"{run_config.seed}:shard{shard}")
+        for agent in self.store.views:
+            agent.rng = self.rng["rickshaws" if agent.store.kind[agent.idx] == KIND_RICKSHAW else "police"]
+        self.spawn_rate = run_config.spawn_rate * len(self.own_nodes) / max(self.city.num_nodes, 1)
+
+    def _refresh_agent_lists(self):
+        views = self.store.views
+        self.rickshaws = [v for v in views if isinstance(v, Rickshaw)]
+        self.police = [v for v in views if isinstance(v, PoliceUnit)]
+
+    def spawn_passengers(self):
+        if self.rng["spawn"].random() < self.spawn_rate:
+            self.add_random_passenger()
+
+    def add_random_passenger(self):
+        """Pickup on one of our nodes, destination anywhere. Ids are unique across shards."""
+        spawn_rng = self.rng["spawn"]
+        p1 = self.own_nodes[spawn_rng.randrange(len(self.own_nodes))].item()
+        p2 = spawn_rng.randrange(self.city.num_nodes - 1)
+        if p2 >= p1: p2 += 1
+        pax_id = self.next_passenger_id * self.num_shards + self.shard
+        self.passengers.add(self.passenger_pool.acquire(p1, p2, pax_id))
+        self.next_passenger_id += 1
+
+    def step(self, dt, incoming):
+        """One lockstep tick: take in handed-off agents, update, hand off leavers."""
+        self.import_agents(incoming)
+        self.update(dt)
+        return self.export_leavers(), self.partial_sums()
+
+    def export_leavers(self):
+        """Removes the agents standing on other shards' nodes; returns {shard: [records]}."""
+        store = self.store
+        n = store.size
+        leaving = np.flatnonzero(self.node_shard[store.current_node[:n]] != self.shard)
+        outgoing = {}
+        for i in leaving.tolist():
+            # Their next edge starts on the other shard, which owns its load from now on
+            if store.kind[i] == KIND_RICKSHAW and store.current_edge[i] >= 0:
+                self.city.add_load(store.current_edge[i], -1)
+            record = (int(store.kind[i]), store.views[i].id, store.export_row(i))
+            outgoing.setdefault(int(self.node_shard[store.current_node[i]]), []).append(record)
+            rider = store.riders[i]
+            if rider is not None:
+                self.passenger_pool.release(rider)
+        if len(leaving):
+            store.remove_rows(leaving.tolist())
+            self._refresh_agent_lists()
+        return outgoing
+
+    def import_agents(self, records):
+        store, city, cfg = self.store, self.city, self.cfg
+        for kind, agent_id, row in records:
+            if kind == KIND_RICKSHAW:
+                agent = Rickshaw(agent_id, city, store, self.rng["rickshaws"])
+            else:
+                agent = PoliceUnit(agent_id, city, store, self.rng["police"], cfg.ticket_chance, self.vision)
+            rider = store.import_row(agent.idx, row, city)
+            if rider is not None:
+                pax_id, node, dest = rider
+                agent.passenger = self.passenger_pool.acquire(node, dest, pax_id)
+            if kind == KIND_RICKSHAW and store.current_edge[agent.idx] >= 0:
+                city.add_load(store.current_edge[agent.idx], 1)
+        if records:
+            self._refresh_agent_lists()
+
+    def partial_sums(self):
+        """This shard's share of the global metrics (edge loads of other shards are all zero here)."""
+        city = self.city
+        return {
+            "load_sum": city.load_sum,
+            "load_sq_sum": city.load_sq_sum,
+            "speed_ratio_sum": city.speed_ratio_sum(self.cfg.traffic_penalty),
+            "deliveries": self.deliveries,
+            "waiting": self.waiting_passengers,
+            "rickshaws": len(self.rickshaws),
+            "police": len(self.police),
+        }
+
+def _worker(conn, run_config, shard, num_shards):
+    engine = ShardEngine(run_config, shard, num_shards)
+    conn.send(engine.partial_sums())
+    while True:
+        msg = conn.recv()
+        if msg[0] == "step":
+            _, dt, incoming = msg
+            conn.send(engine.step(dt, incoming))
+        elif msg[0] == "stop":
+            conn.close()
+            return
+
+class ShardedEngine:
+    """
+    Runs one ShardEngine per worker process, in lockstep. Each tick the coordinator sends
+    every worker the agents handed to it last tick, waits for all of them to finish, routes
+    the new hand-offs, and reduces efficiency/entropy from the per-shard partial sums.
+    Use close() (or a with block) to stop the workers.
+    """
+    def __init__(self, run_config=None, workers=2, **overrides):
+        cfg = run_config if run_config is not None else RunConfig()
+        if overrides:
+            cfg = cfg.with_overrides(**overrides)
+        if cfg.seed is None:
+            # Workers must agree on the seed, so pick it here
+            cfg = cfg.with_overrides(seed=random.SystemRandom().randrange(2**32))
+        self.cfg = cfg
+        self.seed = cfg.seed
+        self.num_shards = workers
+
+        # The coordinator only needs the edge count and bounds; building the city is deterministic
+        engine = SimulationEngine(cfg.with_overrides(n_rickshaws=0, n_police=0))
+        self.num_edges = engine.city.num_edges
+        self.bounds = engine.bounds
+
+        ctx = multiprocessing.get_context("spawn")
+        self.conns = []
+        self.procs = []
+        for shard in range(workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, args=(child, cfg, shard, workers), daemon=True)
+            proc.start()
+            self.conns.append(parent)
+            self.procs.append(proc)
+        self.partials = [conn.recv() for conn in self.conns]
+        self.inbox = [[] for _ in range(workers)]
+        self.handoffs = 0
+
+        # Metrics State
+        self.system_efficiency = 100.0
+        self.system_entropy = 0.0
+        self.deliveries = 0
+        self.waiting_passengers = sum(p["waiting"] for p in self.partials)  # Summed over shards (no passenger objects here)
+
+    def update(self, dt):
+        # 1. All shards tick in parallel
+        for conn, incoming in zip(self.conns, self.inbox):
+            conn.send(("step", dt, incoming))
+        results = [conn.recv() for conn in self.conns]
+
+        # 2. Route hand-offs for the next tick
+        self.inbox = [[] for _ in range(self.num_shards)]
+        for outgoing, _ in results:
+            for shard, records in outgoing.items():
+                self.inbox[shard].extend(records)
+                self.handoffs += len(records)
+
+        # 3. Reduce the metrics
+        self.partials = [partial for _, partial in results]
+        self.calculate_metrics()
+
+    def calculate_metrics(self):
+        """Same formulas as SimulationEngine.calculate_metrics, over the summed shard statistics."""
+        total = {key: sum(p[key] for p in self.partials) for key in self.partials[0]}
+        active_agents = total["load_sum"]
+        if active_agents > 0:
+            self.system_efficiency = (total["speed_ratio_sum"] / active_agents) * 100
+        else:
+            self.system_efficiency = 100.0
+
+        n = self.num_edges
+        if n < 2:
+            self.system_entropy = 0.0
+        else:
+            self.system_entropy = (total["load_sq_sum"] - total["load_sum"] ** 2 / n) / (n - 1)
+
+        self.deliveries = total["deliveries"]
+        self.waiting_passengers = total["waiting"]
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self.procs:
+            proc.join(timeout=5)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
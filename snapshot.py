@@ -0,0 +1,193 @@
+# snapshot.py
+import multiprocessing
+import pickle
+import zlib
+import numpy as np
+from agent_store import KIND_RICKSHAW
+from logic_engine import SimulationEngine, make_rng_streams
+from police import PoliceUnit
+from rickshaw import Rickshaw
+
+SNAPSHOT_VERSION = 1
+
+# --- Snapshot / Restore ---
+
+def snapshot(engine):
+    """
+    The full state of a SimulationEngine as plain data (NumPy arrays, tuples, the RunConfig):
+    RNG states, the agent store and path buffer, waiting and carried passengers, dispatcher
+    reservations and the city's loads and route costs. Nothing in it points back at the
+    engine, so it can be pickled (see save/load) and restored any number of times.
+    """
+    if type(engine) is not SimulationEngine:
+        raise TypeError(f"Snapshots cover the tick engine only, not {type(engine).__name__}")
+    store, city = engine.store, engine.city
+    n = store.size
+    rickshaw_rows = store.kind[:n] == KIND_RICKSHAW
+
+    dispatcher = None
+    if engine.dispatcher is not None:
+        d = engine.dispatcher
+        dispatcher = (d.ticks, {i: pax.id for i, pax in d.assignments.items()})
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "cfg": engine.cfg,
+        "rng": {name: rng.getstate() for name, rng in engine.rng.items()},
+        "ticks": engine.ticks,
+        "deliveries": engine.deliveries,
+        "next_passenger_id": engine.next_passenger_id,
+        "metrics": (engine.system_efficiency, engine.system_entropy),
+
+        # Agents: store rows in order, plus the per-object fields the store does not hold
+        "store": store.snapshot_arrays(),
+        "path_changes": store.path_changes,
+        "agent_ids": [view.id for view in store.views],
+        "tickets_issued": {i: store.views[i].tickets_issued for i in np.flatnonzero(~rickshaw_rows).tolist()},
+        "riders": {i: (pax.id, pax.node, pax.dest) for i, pax in enumerate(store.riders) if pax is not None},
+
+        # Waiting passengers in PassengerIndex order (keeps who-waited-longest per node)
+        "passengers": [(pax.id, pax.node, pax.dest) for pax in engine.passengers],
+        "dispatcher": dispatcher,
+
+        # City: only what changes during a run
+        "edge_load": city.edge_load.copy(),
+        "edge_weight": city.edge_weight.copy(),
+        "edge_capacity": city.edge_capacity.copy(),
+        "route_cost": None if city.route_penalty is None else np.array(city._route_cost),
+    }
+
+def restore(snap, city=None):
+    """
+    Builds a new SimulationEngine in the snapshot's state. With `city` (e.g. the
+    engine the snapshot came from), its topology and route cache are shared through
+    CityGraph.copy() instead of rebuilding the city from the run config.
+    The restored engine continues exactly as the original would have.
+    """
+    if snap["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {snap['version']}")
+    cfg = snap["cfg"]
+
+    # 1. Empty engine on the right city; agents are re-added row by row below
+    engine = SimulationEngine(cfg.with_overrides(n_rickshaws=0, n_police=0),
+                              city=city.copy() if city is not None else None)
+    engine.cfg = cfg
+    city = engine.city
+    _restore_city(city, snap)
+
+    # 2. Agents (constructors draw from the streams, so their states are set afterwards)
+    store = engine.store
+    arrays = snap["store"]
+    for i, (kind, agent_id) in enumerate(zip(arrays["kind"].tolist(), snap["agent_ids"])):
+        if kind == KIND_RICKSHAW:
+            engine.rickshaws.append(Rickshaw(agent_id, city, store, engine.rng["rickshaws"]))
+        else:
+            cop = PoliceUnit(agent_id, city, store, engine.rng["police"], cfg.ticket_chance, engine.vision)
+            cop.tickets_issued = snap["tickets_issued"][i]
+            engine.police.append(cop)
+    store.load_arrays(arrays)
+    store.path_changes = snap["path_changes"]
+
+    # 3. Passengers, carried and waiting
+    pool = engine.passenger_pool
+    for i, (pax_id, node, dest) in snap["riders"].items():
+        store.riders[i] = pool.acquire(node, dest, pax_id)
+    waiting = {}
+    for pax_id, node, dest in snap["passengers"]:
+        pax = waiting[pax_id] = pool.acquire(node, dest, pax_id)
+        engine.passengers.add(pax)
+    if snap["dispatcher"] is not None:
+        ticks, assignments = snap["dispatcher"]
+        engine.dispatcher.ticks = ticks
+        engine.dispatcher.assignments = {i: waiting[pax_id] for i, pax_id in assignments.items()}
+        engine.dispatcher.reserved = set(assignments.values())
+
+    # 4. Counters and random streams
+    engine.ticks = snap["ticks"]
+    engine.deliveries = snap["deliveries"]
+    engine.next_passenger_id = snap["next_passenger_id"]
+    engine.system_efficiency, engine.system_entropy = snap["metrics"]
+    for name, state in snap["rng"].items():
+        engine.rng[name].setstate(state)
+    return engine
+
+def _restore_city(city, snap):
+    city.edge_load[:] = snap["edge_load"]
+    city.recompute_load_stats()
+    city.edge_capacity[:] = snap["edge_capacity"]
+    reroute = not np.array_equal(city.edge_weight, snap["edge_weight"])
+    city.edge_weight[:] = snap["edge_weight"]
+    if snap["route_cost"] is not None:
+        # Load-aware routing: the snapshot's costs, not ones from the current loads
+        city._route_cost = snap["route_cost"].tolist()
+        city._route_trees = {}
+        city.route_version += 1
+    elif reroute:
+        city.build_routing_table()
+
+def clone(engine):
+    """An independent copy of a live engine in this process, sharing its city topology."""
+    return restore(snapshot(engine), city=engine.city)
+
+# --- Files ---
+
+def save(snap, path):
+    """Writes a snapshot as one zlib-compressed pickle."""
+    with open(path, "wb") as f:
+        f.write(zlib.compress(pickle.dumps(snap, protocol=pickle.HIGHEST_PROTOCOL)))
+
+def load(path):
+    with open(path, "rb") as f:
+        return pickle.loads(zlib.decompress(f.read()))
+
+# --- What-If Branches ---
+
+def reseed(engine, salt):
+    """New random streams for a branch (in place, so every agent follows the change)."""
+    for name, rng in make_rng_streams(f"{engine.seed}:{salt}").items():
+        engine.rng[name].setstate(rng.getstate())
+
+def _branch_child(conn, engine, k, run_branch, reseed_branches):
+    engine.recorder = None  # Never write into the parent's recording or event log
+    engine.event_log = None
+    if reseed_branches:
+        reseed(engine, f"branch{k}")
+    conn.send(run_branch(engine, k))
+    conn.close()
+
+def fork(engine, branches, run_branch, reseed_branches=False):
+    """
+    Runs run_branch(engine, k) on `branches` independent copies of a live engine and
+    returns the results in branch order. Where the OS supports fork(), each branch is a
+    child process that inherits the engine copy-on-write (nothing is serialized on the way
+    in; results must be picklable); elsewhere the branches run one after another on clones.
+    With reseed_branches each branch draws from its own random streams.
+
+        fork(engine, 4, lambda e, k: run_headless(e, ticks=3000)["efficiency"][-1])
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        results = []
+        for k in range(branches):
+            branch = clone(engine)
+            if reseed_branches:
+                reseed(branch, f"branch{k}")
+            results.append(run_branch(branch, k))
+        return results
+
+    ctx = multiprocessing.get_context("fork")
+    conns, procs = [], []
+    for k in range(branches):
+        parent, child = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_branch_child, args=(child, engine, k, run_branch, reseed_branches))
+        proc.start()
+        child.close()
+        conns.append(parent)
+        procs.append(proc)
+    try:
+        results = [conn.recv() for conn in conns]
+    except EOFError:
+        raise RuntimeError("A branch process died before returning its result") from None
+    finally:
+        for proc in procs:
+            proc.join()
+    return results
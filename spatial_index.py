@@ -0,0 +1,190 @@
+# spatial_index.py
+import math
+import numpy as np
+
+class NodeGrid:
+    """
+    Uniform grid over the (static) node coordinates of a CityGraph, in meters.
+    Maps every node to a cell so nearby nodes can be found without scanning the city.
+    """
+    def __init__(self, city, cell_size=None):
+        self.city = city
+        xy = city.node_xy
+        if cell_size is None:
+            # Aim for a handful of nodes per cell
+            span_x, span_y = (xy.max(axis=0) - xy.min(axis=0)) if city.num_nodes else (0.0, 0.0)
+            area = max(span_x, 1.0) * max(span_y, 1.0)
+            cell_size = max(math.sqrt(area * 4 / max(city.num_nodes, 1)), 1.0)
+        self.cell_size = cell_size
+
+        self.node_cell = [(int(x // cell_size), int(y // cell_size)) for x, y in xy.tolist()]
+        self.cells = {}
+        for n, cell in enumerate(self.node_cell):
+            self.cells.setdefault(cell, []).append(n)
+
+        cxs = [cx for cx, cy in self.cells] or [0]
+        cys = [cy for cx, cy in self.cells] or [0]
+        self.max_ring = max(max(cxs) - min(cxs), max(cys) - min(cys))
+
+    def ring(self, center, r):
+        """Cells at Chebyshev distance exactly r from the center cell."""
+        cx, cy = center
+        if r == 0:
+            yield center
+            return
+        for dx in range(-r, r + 1):
+            yield (cx + dx, cy - r)
+            yield (cx + dx, cy + r)
+        for dy in range(-r + 1, r):
+            yield (cx - r, cy + dy)
+            yield (cx + r, cy + dy)
+
+    def nodes_within(self, node, radius):
+        """All nodes whose distance to `node` is at most `radius` meters (including itself)."""
+        xy = self.city.node_xy
+        x0, y0 = xy[node]
+        r2 = radius * radius
+        reach = int(math.ceil(radius / self.cell_size))
+        cx, cy = self.node_cell[node]
+        found = []
+        for gx in range(cx - reach, cx + reach + 1):
+            for gy in range(cy - reach, cy + reach + 1):
+                for n in self.cells.get((gx, gy), ()):
+                    x, y = xy[n]
+                    if (x - x0) ** 2 + (y - y0) ** 2 <= r2:
+                        found.append(n)
+        return found
+
+class PassengerIndex:
+    """
+    Waiting passengers bucketed by node, with a grid over node coordinates
+    for nearest-passenger queries. Insert, remove and pickup are O(1).
+    Iterating yields every waiting passenger (spawn order within a node).
+    """
+    def __init__(self, city, grid=None):
+        self.grid = grid if grid is not None else NodeGrid(city)
+        self.by_node = {}      # node -> {passenger id: Passenger}, oldest first
+        self.cell_nodes = {}   # cell -> set of nodes that have someone waiting
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for waiting in self.by_node.values():
+            yield from waiting.values()
+
+    def add(self, pax):
+        waiting = self.by_node.get(pax.node)
+        if waiting is None:
+            waiting = self.by_node[pax.node] = {}
+            self.cell_nodes.setdefault(self.grid.node_cell[pax.node], set()).add(pax.node)
+        waiting[pax.id] = pax
+        self.count += 1
+
+    def remove(self, pax):
+        waiting = self.by_node[pax.node]
+        del waiting[pax.id]
+        self.count -= 1
+        if not waiting:
+            del self.by_node[pax.node]
+            cell = self.grid.node_cell[pax.node]
+            self.cell_nodes[cell].discard(pax.node)
+            if not self.cell_nodes[cell]:
+                del self.cell_nodes[cell]
+
+    def first_at(self, node):
+        """The longest-waiting passenger at a node, or None."""
+        waiting = self.by_node.get(node)
+        return next(iter(waiting.values())) if waiting else None
+
+    def pop_at(self, node):
+        """Removes and returns the longest-waiting passenger at a node, or None."""
+        pax = self.first_at(node)
+        if pax is not None:
+            self.remove(pax)
+        return pax
+
+    def nearest(self, node):
+        """The waiting passenger closest (straight-line) to `node`, or None."""
+        if not self.count:
+            return None
+        grid = self.grid
+        xy = grid.city.node_xy
+        x0, y0 = xy[node]
+        center = grid.node_cell[node]
+
+        best_node = None
+        best_dist = math.inf
+
+        def consider(cell):
+            nonlocal best_node, best_dist
+            for n in self.cell_nodes.get(cell, ()):
+                x, y = xy[n]
+                dist = (x - x0) ** 2 + (y - y0) ** 2
+                if dist < best_dist or (dist == best_dist and n < best_node):
+                    best_dist = dist
+                    best_node = n
+
+        for r in range(grid.max_ring + 1):
+            # Few occupied cells left to look at? Check them all instead of widening rings
+            if 8 * r > len(self.cell_nodes):
+                for cell in list(self.cell_nodes):
+                    consider(cell)
+                break
+            for cell in grid.ring(center, r):
+                consider(cell)
+            # Anything in ring r+1 is at least r cells away
+            reach = r * grid.cell_size
+            if best_node is not None and best_dist <= reach * reach:
+                break
+
+        return self.first_at(best_node) if best_node is not None else None
+
+    # Above this many nodes with someone waiting, nearest_nodes() answers query by query
+    BATCH_LIMIT = 2048
+
+    def nearest_nodes(self, nodes):
+        """
+        nearest() for many query nodes at once: for each, the node of the closest waiting
+        passenger (-1 if nobody waits), with the same tie-break (lower node wins).
+        One NumPy pass over queries x waiting nodes, in blocks to bound memory.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if not self.count or len(self.by_node) > self.BATCH_LIMIT:
+            return np.array([self._nearest_node(n) for n in nodes.tolist()], dtype=np.int64)
+        xy = self.grid.city.node_xy
+        waiting = np.array(sorted(self.by_node), dtype=np.int64)
+        wx, wy = xy[waiting, 0], xy[waiting, 1]
+        best = np.empty(len(nodes), dtype=np.int64)
+        block = max(1, (1 << 20) // len(waiting))
+        for k in range(0, len(nodes), block):
+            q = nodes[k:k + block]
+            dist = (wx - xy[q, 0, None]) ** 2 + (wy - xy[q, 1, None]) ** 2
+            best[k:k + block] = waiting[np.argmin(dist, axis=1)]  # First minimum = lowest node
+        return best
+
+    def _nearest_node(self, node):
+        pax = self.nearest(node)
+        return -1 if pax is None else pax.node
+
+class VisionMap:
+    """
+    Which nodes a police drone can see from each node: the node itself, the far
+    ends of the streets leaving it, and every node within `radius` meters.
+    Node positions are static, so each answer is computed once and cached.
+    """
+    def __init__(self, city, grid, radius):
+        self.city = city
+        self.grid = grid
+        self.radius = radius
+        self._cache = {}
+
+    def visible_from(self, node):
+        nodes = self._cache.get(node)
+        if nodes is None:
+            seen = set(self.grid.nodes_within(node, self.radius))
+            seen.update(self.city.out_neighbors(node).tolist())
+            seen.add(node)
+            nodes = self._cache[node] = sorted(seen)
+        return nodes
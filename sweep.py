@@ -0,0 +1,119 @@
+# sweep.py
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+
+from headless import run_headless
+from logic_engine import SimulationEngine
+from run_config import RunConfig
+
+def expand_grid(base, grid, seeds):
+    """
+    Every combination of the grid values (dict: field name -> list of values),
+    repeated for each seed, as RunConfig objects built on top of `base`.
+    """
+    names = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        for seed in seeds:
+            configs.append(base.with_overrides(seed=seed, **dict(zip(names, values))))
+    return configs
+
+def run_one(cfg, ticks, dt):
+    """Runs one configuration headless and boils its time series down to a summary."""
+    start = time.perf_counter()
+    engine = SimulationEngine(cfg)
+    series = run_headless(engine, dt=dt, ticks=ticks)
+    wall = time.perf_counter() - start
+
+    sim_seconds = series["time"][-1] if series["time"] else 0.0
+    deliveries = engine.deliveries
+    return {
+        "config": cfg.to_dict(),
+        "ticks": ticks,
+        "sim_seconds": sim_seconds,
+        "wall_seconds": wall,
+        "deliveries": deliveries,
+        "deliveries_per_hour": deliveries * 3600 / sim_seconds if sim_seconds else 0.0,
+        "mean_efficiency": statistics.fmean(series["efficiency"]) if ticks else 100.0,
+        "final_efficiency": series["efficiency"][-1] if ticks else 100.0,
+        "mean_entropy": statistics.fmean(series["entropy"]) if ticks else 0.0,
+        "max_waiting_passengers": max(series["waiting_passengers"], default=0),
+        "total_money": sum(a.money for a in engine.rickshaws),
+    }
+
+def sweep(configs, ticks, dt=1.0 / 60, workers=None):
+    """
+    Fans the runs out over a process pool and yields each summary as soon as
+    its run finishes (completion order, not submission order).
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_one, cfg, ticks, dt) for cfg in configs]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+def parse_assignment(text):
+    """'name=v1,v2,...' -> (name, [values]); values are parsed as JSON where possible."""
+    name, _, raw = text.partition("=")
+    name = name.strip()
+    if name not in RunConfig.field_names():
+        raise SystemExit(f"Unknown setting '{name}'. Choose from: {', '.join(RunConfig.field_names())}")
+    values = []
+    for item in raw.split(","):
+        try:
+            values.append(json.loads(item))
+        except json.JSONDecodeError:
+            values.append(item)
+    return name, values
+
+def parse_seeds(text):
+    """'0-9' or '1,5,7' -> list of ints."""
+    if "-" in text:
+        lo, hi = text.split("-")
+        return list(range(int(lo), int(hi) + 1))
+    return [int(s) for s in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a parameter grid x seeds across all cores.")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2",
+                        help="A RunConfig field and the values to sweep (repeatable)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Fix a RunConfig field for every run (repeatable)")
+    parser.add_argument("--layout", default=None, help="JSON city layout for build_generated_city")
+    parser.add_argument("--seeds", default="0-3")
+    parser.add_argument("--ticks", type=int, default=6000)
+    parser.add_argument("--dt", type=float, default=1.0 / 60)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--output", default="sweep_results.jsonl", help="JSON-lines file, one summary per run")
+    args = parser.parse_args()
+
+    base = RunConfig()
+    for text in args.set:
+        name, values = parse_assignment(text)
+        base = base.with_overrides(**{name: values[0]})
+    if args.layout:
+        base = base.with_overrides(city_layout=json.loads(args.layout))
+    grid = dict(parse_assignment(text) for text in args.grid)
+
+    configs = expand_grid(base, grid, parse_seeds(args.seeds))
+    workers = args.workers or os.cpu_count()
+    print(f"{len(configs)} runs on {workers} processes -> {args.output}", file=sys.stderr)
+
+    start = time.perf_counter()
+    with open(args.output, "a") as out:
+        for done, summary in enumerate(sweep(configs, args.ticks, args.dt, workers), 1):
+            out.write(json.dumps(summary) + "\n")
+            out.flush()
+            swept = {name: summary["config"][name] for name in grid}
+            print(f"[{done}/{len(configs)}] seed={summary['config']['seed']} {swept} "
+                  f"deliveries/h={summary['deliveries_per_hour']:.1f} eff={summary['mean_efficiency']:.1f}%",
+                  file=sys.stderr)
+    print(f"Finished in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
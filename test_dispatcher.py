@@ -0,0 +1,30 @@
+# test_dispatcher.py
+import itertools
+import numpy as np
+from dispatcher import solve_assignment
+
+def _brute_force(cost):
+    """Cheapest total over every way to match min(rows, cols) pairs."""
+    n, m = cost.shape
+    if n <= m:
+        return min(sum(cost[i, j] for i, j in zip(range(n), cols)) for cols in itertools.permutations(range(m), n))
+    return min(sum(cost[i, j] for i, j in zip(rows, range(m))) for rows in itertools.permutations(range(n), m))
+
+def test_solve_assignment_matches_brute_force():
+    """Random rectangular matrices (both orientations, with ties): optimal cost, one-to-one pairs."""
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n, m = rng.integers(1, 6, size=2)
+        if rng.random() < 0.5:
+            cost = rng.integers(0, 5, size=(n, m)).astype(float)  # Lots of ties
+        else:
+            cost = rng.random((n, m)) * 100
+        rows, cols = solve_assignment(cost)
+        assert len(rows) == len(cols) == min(n, m)
+        assert len(set(rows.tolist())) == len(rows) and len(set(cols.tolist())) == len(cols)
+        assert np.isclose(cost[rows, cols].sum(), _brute_force(cost))
+
+def test_solve_assignment_empty():
+    for shape in ((0, 3), (3, 0)):
+        rows, cols = solve_assignment(np.zeros(shape))
+        assert len(rows) == len(cols) == 0
@@ -0,0 +1,33 @@
+# test_snapshot.py
+import numpy as np
+import snapshot
+from logic_engine import SimulationEngine
+
+def _state(engine):
+    store = engine.store
+    n = store.size
+    return (engine.deliveries, engine.system_efficiency, engine.system_entropy, len(engine.passengers),
+            store.current_node[:n].tolist(), store.target_node[:n].tolist(), store.progress[:n].tolist(),
+            engine.city.edge_load.tolist())
+
+def _step(engine, ticks):
+    for _ in range(ticks):
+        engine.update(1 / 60)
+
+def test_clone_and_restore_replay_the_original(tmp_path):
+    """A clone, and a restore from a saved file, step exactly like the engine they came from."""
+    for overrides in ({}, {"dispatch_interval": 10, "n_rickshaws": 30},
+                      {"routing": "load", "route_refresh_ticks": 20}):
+        engine = SimulationEngine(seed=4, spawn_rate=0.2, rickshaw_speed_base=2.0, **overrides)
+        _step(engine, 300)
+
+        snap = snapshot.snapshot(engine)
+        snapshot.save(snap, tmp_path / "snap.bin")
+        copies = [snapshot.clone(engine), snapshot.restore(snapshot.load(tmp_path / "snap.bin"))]
+        assert all(_state(copy) == _state(engine) for copy in copies)
+
+        for engine_or_copy in [engine] + copies:
+            _step(engine_or_copy, 600)
+        assert engine.deliveries > 0
+        assert all(_state(copy) == _state(engine) for copy in copies)
+        assert np.array_equal(copies[0].store.positions(copies[0].city), engine.store.positions(engine.city))
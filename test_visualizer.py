@@ -0,0 +1,35 @@
+# test_visualizer.py
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import config as c
+from city import CityGraph
+from logic_engine import SimulationEngine
+from visualizer import Visualizer
+
+METRICS = {"efficiency": 50.0, "entropy": 0.5}
+
+def _pixels(surface):
+    return pygame.surfarray.array3d(surface)
+
+def test_dirty_rects_match_full_redraw():
+    """Repainting only the edges whose jam state flipped gives the same frame as a full redraw."""
+    for layout in (None, {"zones": 4, "zone_rows": 8, "zone_cols": 8}):
+        engine = SimulationEngine(city=CityGraph(layout=layout), seed=1, n_rickshaws=0, n_police=0)
+        city = engine.city
+        vis = Visualizer(engine.bounds)
+        vis.draw(city, [], [], [], METRICS)
+
+        rng = np.random.default_rng(7)
+        for _ in range(3):
+            # Jam a random third of the edges, clear the rest
+            city.edge_load[:] = np.where(rng.random(city.num_edges) < 0.3, c.JAM_LOAD + 1, 0)
+            vis.draw(city, [], [], [], METRICS)
+            incremental = _pixels(vis.screen)
+
+            vis.static_city = None
+            vis.draw(city, [], [], [], METRICS)
+            assert np.array_equal(incremental, _pixels(vis.screen))
+    pygame.quit()
@@ -1,5 +1,6 @@
 # utils.py
 import math
+import numpy as np
 import pygame
 import config as c
 
@@ -22,4 +23,32 @@ def draw_triangle(surface, color, pos, angle, size=10):
     p1 = (pos[0] + size * math.cos(angle), pos[1] - size * math.sin(angle))
     p2 = (pos[0] + size*0.7 * math.cos(angle + 2.5), pos[1] - size*0.7 * math.sin(angle + 2.5))
     p3 = (pos[0] + size*0.7 * math.cos(angle - 2.5), pos[1] - size*0.7 * math.sin(angle - 2.5))
-    pygame.draw.polygon(surface, color, [p1, p2, p3])
\ No newline at end of file
+    return pygame.draw.polygon(surface, color, [p1, p2, p3])
+
+# --- BATCHED VERSIONS (NumPy arrays in, arrays out) ---
+
+def map_coords_to_screen_array(lat, lon, min_lat, max_lat, min_lon, max_lon):
+    """Converts arrays of GPS coordinates to an (n, 2) integer array of screen pixels."""
+    if max_lon == min_lon: max_lon += 0.0001
+    if max_lat == min_lat: max_lat += 0.0001
+    x_pct = (np.asarray(lon, dtype=float) - min_lon) / (max_lon - min_lon)
+    y_pct = (np.asarray(lat, dtype=float) - min_lat) / (max_lat - min_lat)
+    screen_x = 50 + x_pct * (c.SCREEN_WIDTH - 100)
+    screen_y = c.SCREEN_HEIGHT - (50 + y_pct * (c.SCREEN_HEIGHT - 100))
+    return np.stack([screen_x, screen_y], axis=-1).astype(np.int64)
+
+def get_angles(start, end):
+    """get_angle for (n, 2) arrays of start and end points."""
+    dx = end[:, 0] - start[:, 0]
+    dy = -(end[:, 1] - start[:, 1])
+    return np.arctan2(dy, dx)
+
+def triangle_vertices(pos, angles, size=10):
+    """Corners of the draw_triangle arrow for every agent at once, as an (n, 3, 2) array."""
+    offsets = np.array([0.0, 2.5, -2.5])
+    scale = np.array([size, size * 0.7, size * 0.7])
+    a = angles[:, None] + offsets
+    verts = np.empty((len(pos), 3, 2))
+    verts[:, :, 0] = pos[:, 0, None] + scale * np.cos(a)
+    verts[:, :, 1] = pos[:, 1, None] - scale * np.sin(a)
+    return verts
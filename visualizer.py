@@ -1,102 +1,205 @@
+import numpy as np
 import pygame
 import config as c
-from utils import map_coords_to_screen, draw_triangle, get_angle
+from utils import map_coords_to_screen_array, get_angles, triangle_vertices
+
+BACKGROUND = (40, 40, 40)
 
 class Visualizer:
     def __init__(self, bounds):
         pygame.init()
         self.screen = pygame.display.set_mode((c.SCREEN_WIDTH, c.SCREEN_HEIGHT))
         pygame.display.set_caption("Urban Swarm: Homeostasis Monitor")
-        self.bounds = bounds 
-        
+        self.bounds = bounds
+
         # Font for UI
         self.font = pygame.font.SysFont("monospace", 16, bold=True)
 
+        # Static layer (see _build_static), rebuilt if a different city is drawn
+        self.static_city = None
+        self.scene = None
+        self.agent_rows = {}    # id(agent list) -> (the list itself, its length, store, row indices)
+        self.sprite_rects = []  # Where last frame's agents/passengers/HUD were drawn
+
     def draw(self, city, rickshaws, police, passengers, metrics):
         """Now accepts a 'metrics' dict or object to display stats."""
-        self.screen.fill((40, 40, 40)) 
-        
-        min_lat, max_lat, min_lon, max_lon = self.bounds
+        full_redraw = False
+        if city is not self.static_city:
+            self._build_static(city)
+            full_redraw = True
 
-        # 1. Draw Roads
-        for u, v, data in city.G.edges(data=True):
-            load = data.get('current_load', 0)
-            u_pos = city.G.nodes[u]['pos']
-            v_pos = city.G.nodes[v]['pos']
-            start = map_coords_to_screen(u_pos[1], u_pos[0], min_lat, max_lat, min_lon, max_lon)
-            end = map_coords_to_screen(v_pos[1], v_pos[0], min_lat, max_lat, min_lon, max_lon)
-            
-            # Draw Bridge Distinctly
-            is_bridge = data.get('type') == 'bridge'
-            width = 12 if is_bridge else 6
-            color = (60, 100, 120) if is_bridge else (70, 70, 70)
-            
-            if load > 2: color = c.COLOR_JAM
-
-            pygame.draw.line(self.screen, color, start, end, width)
-
-        # 2. Draw Intersections
-        for n, data in city.G.nodes(data=True):
-            pos = data['pos']
-            s_pos = map_coords_to_screen(pos[1], pos[0], min_lat, max_lat, min_lon, max_lon)
-            color = (70, 70, 70)
-            size = 5
-            if data.get('type') in ['residential', 'commercial']:
-                color = (100, 100, 100)
-                size = 8
-            pygame.draw.circle(self.screen, color, s_pos, size)
+        # 1. + 2. Roads and Intersections: only edges whose jam state flipped are repainted
+        dirty = self._update_jams(city)
+
+        # Erase last frame's sprites by copying the scene back over them
+        for rect in self.sprite_rects:
+            self.screen.blit(self.scene, rect, rect)
+        dirty.extend(self.sprite_rects)
+        if full_redraw:
+            self.screen.blit(self.scene, (0, 0))
+
+        sprites = []
+        node_points = self.node_points
 
         # 3. Draw Passengers
         for p in passengers:
-            pos = city.G.nodes[p.node]['pos']
-            s_pos = map_coords_to_screen(pos[1], pos[0], min_lat, max_lat, min_lon, max_lon)
-            pygame.draw.circle(self.screen, c.COLOR_PASSENGER, s_pos, 6)
+            sprites.append(pygame.draw.circle(self.screen, c.COLOR_PASSENGER, node_points[p.node], 6))
 
         # 4. Draw Rickshaws
-        for agent in rickshaws:
-            pos = agent.get_position()
-            s_pos = map_coords_to_screen(pos[1], pos[0], min_lat, max_lat, min_lon, max_lon)
-            angle = 0
-            if agent.target_node:
-                t_pos = city.G.nodes[agent.target_node]['pos']
-                t_screen = map_coords_to_screen(t_pos[1], t_pos[0], min_lat, max_lat, min_lon, max_lon)
-                angle = get_angle(s_pos, t_screen)
-            
-            color = c.COLOR_RICKSHAW_FULL if agent.passenger else c.COLOR_RICKSHAW_EMPTY
-            draw_triangle(self.screen, color, s_pos, angle, 12)
+        sprites.extend(self._draw_agents(city, rickshaws, 12, full_color=c.COLOR_RICKSHAW_FULL,
+                                         color=c.COLOR_RICKSHAW_EMPTY))
 
         # 5. Draw Police
-        for cop in police:
-            pos = cop.get_position()
-            s_pos = map_coords_to_screen(pos[1], pos[0], min_lat, max_lat, min_lon, max_lon)
-            angle = 0
-            if cop.target_node:
-                t_pos = city.G.nodes[cop.target_node]['pos']
-                t_screen = map_coords_to_screen(t_pos[1], t_pos[0], min_lat, max_lat, min_lon, max_lon)
-                angle = get_angle(s_pos, t_screen)
-            
-            draw_triangle(self.screen, (255, 255, 255), s_pos, angle, 14)
+        sprites.extend(self._draw_agents(city, police, 14, color=(255, 255, 255)))
 
         # 6. Draw HUD (Metrics)
-        self._draw_hud(metrics)
-        
-        pygame.display.flip()
+        sprites.extend(self._draw_hud(metrics))
+
+        self.sprite_rects = sprites
+        if full_redraw or len(dirty) + len(sprites) > c.MAX_DIRTY_RECTS:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty + sprites)
+
+    def _draw_agents(self, city, agents, size, color, full_color=None):
+        """
+        Draws a list of agents as arrows in one batch: positions, projection, headings
+        and triangle corners are computed with NumPy, leaving one polygon call per agent.
+        Agents carrying a passenger get full_color (if given). Returns the drawn rects.
+        """
+        store, rows = self._agent_rows(agents)
+        if store is None:
+            return []
+
+        # Where everyone is, on screen
+        pos = store.positions(city, rows)
+        min_lat, max_lat, min_lon, max_lon = self.bounds
+        s_pos = map_coords_to_screen_array(pos[:, 1], pos[:, 0], min_lat, max_lat, min_lon, max_lon)
+
+        # Point towards the next node (0 if standing still)
+        target = store.target_node[rows]
+        heading = target >= 0
+        angles = np.zeros(len(rows))
+        if heading.any():
+            angles[heading] = get_angles(s_pos[heading], self.node_screen[target[heading]])
+
+        verts = triangle_vertices(s_pos, angles, size).tolist()
+        if full_color is None:
+            colors = [color] * len(rows)
+        else:
+            colors = [full_color if full else color for full in (store.passenger[rows] >= 0).tolist()]
+
+        polygon, screen = pygame.draw.polygon, self.screen
+        return [polygon(screen, col, v) for col, v in zip(colors, verts)]
+
+    def _agent_rows(self, agents):
+        """
+        The AgentStore behind a list of agent views and their row indices (cached per list).
+        The cache holds on to the list, so its id cannot be reused by another list meanwhile.
+        """
+        if not agents:
+            return None, None
+        cached = self.agent_rows.get(id(agents))
+        if cached is None or cached[0] is not agents or cached[1] != len(agents) or cached[2] is not agents[0].store:
+            rows = np.fromiter((a.idx for a in agents), dtype=np.int64, count=len(agents))
+            cached = self.agent_rows[id(agents)] = (agents, len(agents), agents[0].store, rows)
+        return cached[2], cached[3]
+
+    def _build_static(self, city):
+        """
+        Pre-renders the road network once: screen coordinates per node, a bounding
+        rect per edge and node, and the scene surface with every road in its current color.
+        """
+        min_lat, max_lat, min_lon, max_lon = self.bounds
+        self.static_city = city
+        xy = map_coords_to_screen_array(city.node_pos[:, 1], city.node_pos[:, 0], min_lat, max_lat, min_lon, max_lon)
+        self.node_screen = xy
+        self.node_points = [tuple(p) for p in xy.tolist()]
+
+        # Style per edge and node (bridges wider, zone nodes bigger)
+        self.edge_width = np.where(city.edge_is_bridge, 12, 6)
+        self.edge_color = [(60, 100, 120) if b else (70, 70, 70) for b in city.edge_is_bridge.tolist()]
+        zoned = [t in ('residential', 'commercial') for t in city.node_type]
+        self.node_color = [(100, 100, 100) if z else (70, 70, 70) for z in zoned]
+        self.node_size = np.where(zoned, 8, 5) if len(zoned) else np.zeros(0, dtype=np.int64)
+
+        # Bounding boxes (left, top, right, bottom) used to find what overlaps a dirty area.
+        # Thick diagonal lines and their end caps reach past width / 2, so edges are padded
+        # by the full width on every side.
+        src, dst = xy[city.edge_src], xy[city.edge_dst]
+        pad = self.edge_width[:, None] + 1
+        self.edge_box = np.hstack([np.minimum(src, dst) - pad, np.maximum(src, dst) + pad + 1])
+        size = self.node_size[:, None]
+        self.node_box = np.hstack([xy - size, xy + size + 1])
+
+        self.jammed = city.edge_load > c.JAM_LOAD
+        self.scene = pygame.Surface(self.screen.get_size())
+        self.scene.fill(BACKGROUND)
+        self._paint_roads(self.scene, city, np.arange(city.num_edges), np.arange(city.num_nodes))
+        self.patch = pygame.Surface(self.screen.get_size())  # Where jam changes are repainted (see _update_jams)
+        self.sprite_rects = []
+
+    def _paint_roads(self, surface, city, edges, nodes):
+        """Draws the given edges (in id order) and then the given nodes onto a surface."""
+        node_screen = self.node_points
+        for e in edges.tolist():
+            color = c.COLOR_JAM if self.jammed[e] else self.edge_color[e]
+            pygame.draw.line(surface, color, node_screen[city.edge_src[e]], node_screen[city.edge_dst[e]],
+                             int(self.edge_width[e]))
+        for n in nodes.tolist():
+            pygame.draw.circle(surface, self.node_color[n], node_screen[n], int(self.node_size[n]))
+
+    def _update_jams(self, city):
+        """
+        Repaints the scene where an edge crossed the jam threshold and copies those
+        areas to the screen. Returns the changed screen rects.
+        """
+        jammed = city.edge_load > c.JAM_LOAD
+        changed = np.flatnonzero(jammed != self.jammed)
+        self.jammed = jammed
+        rects = []
+        for e in changed.tolist():
+            left, top, right, bottom = self.edge_box[e].tolist()
+            rect = pygame.Rect(left, top, right - left, bottom - top)
+
+            # Repaint everything overlapping the rect in the original drawing order. This is done
+            # unclipped on the patch surface: pygame rasterizes thick lines differently under a
+            # clip rect, so drawing straight into the scene would not match a full redraw.
+            self.patch.fill(BACKGROUND, rect)
+            self._paint_roads(self.patch, city, self._overlapping(self.edge_box, rect),
+                              self._overlapping(self.node_box, rect))
+            self.scene.blit(self.patch, rect, rect)
+
+            self.screen.blit(self.scene, rect, rect)
+            rects.append(rect)
+        return rects
+
+    @staticmethod
+    def _overlapping(boxes, rect):
+        return np.flatnonzero((boxes[:, 0] < rect.right) & (boxes[:, 2] > rect.left) &
+                              (boxes[:, 1] < rect.bottom) & (boxes[:, 3] > rect.top))
 
     def _draw_hud(self, metrics):
-        """Displays System Efficiency and Entropy."""
+        """Displays System Efficiency and Entropy. Returns the rects drawn over."""
         eff = metrics['efficiency']
         ent = metrics['entropy']
-        
+
         # Color Logic
         eff_color = (0, 255, 0) if eff > 70 else (255, 165, 0) # Green -> Orange
         if eff < 40: eff_color = (255, 0, 0) # Red
-        
+
         # Render Text
         t_eff = self.font.render(f"SYSTEM HEALTH: {eff:.1f}%", True, eff_color)
         t_ent = self.font.render(f"ENTROPY (VAR): {ent:.2f}", True, (200, 200, 200))
         t_note = self.font.render(f"Bottleneck Status: {'CRITICAL' if ent > 1.5 else 'STABLE'}", True, (200, 200, 200))
 
         # Blit
-        self.screen.blit(t_eff, (20, 20))
-        self.screen.blit(t_ent, (20, 45))
-        self.screen.blit(t_note, (20, 70))
\ No newline at end of file
+        rects = [self.screen.blit(t_eff, (20, 20)),
+                 self.screen.blit(t_ent, (20, 45)),
+                 self.screen.blit(t_note, (20, 70))]
+
+        # Optional profiler lines (metrics['profile'], see Profiler.hud_lines)
+        for k, line in enumerate(metrics.get('profile', ())):
+            t_prof = self.font.render(line, True, (160, 160, 160))
+            rects.append(self.screen.blit(t_prof, (20, 105 + 20 * k)))
+        return rects